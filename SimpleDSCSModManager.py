@@ -1,5 +1,6 @@
 import ctypes
 from datetime import datetime
+import multiprocessing
 import os
 import platform
 import stat
@@ -122,6 +123,8 @@ if hasattr(QtCore.Qt, 'AA_UseHighDpiPixmaps'):
     QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps, True)
     
 if __name__ == '__main__':
+    # Needed for the process-pool patcher backend in frozen builds
+    multiprocessing.freeze_support()
     error_code = 0
     try:
         app = QtWidgets.QApplication([]) 
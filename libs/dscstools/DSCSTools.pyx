@@ -103,6 +103,8 @@ cdef class ArchiveInfo:
 cdef extern from "py/python.h" namespace "dscstools":
     void _py_dobozCompress(const string &, const string &) nogil
     void _py_dobozDecompress(const string &, const string &) nogil
+    string _py_dobozCompressBuffer(const string &) nogil except +
+    string _py_dobozDecompressBuffer(const string &) nogil except +
 
     void _py_extractMDB1    (const string & src, const string & dst, const bool_t decompress) nogil
     void _py_packMDB1       (const string & src, const string & dst, const CompressMode mode, bool_t doCrypt, const bool_t useStdout)  nogil
@@ -135,6 +137,20 @@ def dobozDecompress(str src, str dst) -> None:
     with nogil:
         _py_dobozDecompress(str_src, str_dst)
         
+def dobozCompressBytes(bytes data) -> bytes:
+    cdef string str_data = bytes_to_str(data)
+    cdef string out
+    with nogil:
+        out = _py_dobozCompressBuffer(str_data)
+    return out
+
+def dobozDecompressBytes(bytes data) -> bytes:
+    cdef string str_data = bytes_to_str(data)
+    cdef string out
+    with nogil:
+        out = _py_dobozDecompressBuffer(str_data)
+    return out
+        
 def extractMDB1(str src, str dst, bool_t decompress=True):
     str_src = bytes_to_str(src.encode("utf8"))
     str_dst = bytes_to_str(dst.encode("utf8"))
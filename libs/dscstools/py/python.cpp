@@ -1,9 +1,12 @@
 #include <iostream>
+#include <stdexcept>
 
 #include "../DSCSTools/DSCSTools/include/MDB1.h"
 #include "../DSCSTools/DSCSTools/include/EXPA.h"
 #include "../DSCSTools/DSCSTools/include/AFS2.h"
 #include "../DSCSTools/DSCSTools/include/SaveFile.h"
+#include "../DSCSTools/libs/doboz/Compressor.h"
+#include "../DSCSTools/libs/doboz/Decompressor.h"
 
 namespace dscstools
 {
@@ -20,6 +23,38 @@ namespace dscstools
         mdb1::dobozDecompress(_source, _target);
     }
 
+    std::string _py_dobozCompressBuffer(const std::string& source) {
+        doboz::Compressor comp;
+        size_t destSize;
+
+        std::string output(doboz::Compressor::getMaxCompressedSize(source.size()), '\0');
+        doboz::Result result = comp.compress(source.data(), source.size(), &output[0], output.size(), destSize);
+
+        if (result != doboz::RESULT_OK)
+            throw std::runtime_error("Error: something went wrong while compressing, doboz error code: " + std::to_string(result));
+
+        output.resize(destSize);
+        return output;
+    }
+
+    std::string _py_dobozDecompressBuffer(const std::string& source) {
+        doboz::CompressionInfo info;
+        doboz::Decompressor decomp;
+
+        decomp.getCompressionInfo(source.data(), source.size(), info);
+
+        if (info.compressedSize != source.size() || info.version != 0)
+            throw std::runtime_error("Error: input data is not doboz compressed!");
+
+        std::string output(info.uncompressedSize, '\0');
+        doboz::Result result = decomp.decompress(source.data(), source.size(), &output[0], output.size());
+
+        if (result != doboz::RESULT_OK)
+            throw std::runtime_error("Error: something went wrong while decompressing, doboz error code: " + std::to_string(result));
+
+        return output;
+    }
+
     // MDB1
     void _py_extractMDB1(const std::string source, const std::string target, const bool decompress = true) {
         boost::filesystem::path _source = boost::filesystem::exists(source) ? source : boost::filesystem::current_path().append(source);
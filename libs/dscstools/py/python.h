@@ -7,6 +7,8 @@ namespace dscstools
     // doboz
     void _py_dobozCompress(const std::string source, const std::string target);
     void _py_dobozDecompress(const std::string source, const std::string target);
+    std::string _py_dobozCompressBuffer(const std::string& source);
+    std::string _py_dobozDecompressBuffer(const std::string& source);
 
     // MDB1
     void _py_extractMDB1(const std::string source, const std::string target, const bool decompress = true);
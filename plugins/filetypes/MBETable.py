@@ -31,10 +31,5 @@ class MBE_table(BaseFiletype):
     build_elements = [MBETableBuildElement]
     filetype_id = "mbetable"
     filepack = "MBE"
-    
-    @staticmethod
-    def checkIfMatch(path, filename):
-        if os.path.split(path)[-1].split('.')[-1] == 'mbe' and os.path.splitext(filename)[-1] == '.csv':
-            return True
-        else:
-            return False
+    extensions = (".csv",)
+    parent_dir_suffixes = ("mbe",)
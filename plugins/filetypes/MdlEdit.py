@@ -32,12 +32,6 @@ class ModelEditFile(BaseFiletype):
     build_elements = [make_build_elem_class(i, ext) for i, ext in enumerate(["name", "skel", "geom", "anim"])]
     filetype_id = "mdledit"
     filepack = "Model"
-    
-    @staticmethod
-    def checkIfMatch(path, filename):
-        if os.path.splitext(filename)[-1] == '.mdledit':
-            return True
-        else:
-            return False
+    extensions = (".mdledit",)
 
         
\ No newline at end of file
@@ -31,13 +31,7 @@ def make_model_file_elements(ext):
         build_elements = [MdlFileBuildElement]
         filetype_id = ext + "file"
         filepack = "Model"
-        
-        @staticmethod
-        def checkIfMatch(path, filename):
-            if os.path.splitext(filename)[-1] == f'.{ext}':
-                return True
-            else:
-                return False
+        extensions = (f".{ext}",)
     
     return MdlFile
         
@@ -28,10 +28,4 @@ class RequestFileBuildElement(BaseBuildElement):
 class RequestFile(BaseFiletype):
     filetype_id = "request"
     build_elements = [RequestFileBuildElement]
-    
-    @staticmethod
-    def checkIfMatch(path, filename):
-        if os.path.splitext(filename)[-1] == '.request':
-            return True
-        else:
-            return False
\ No newline at end of file
+    extensions = (".request",)
\ No newline at end of file
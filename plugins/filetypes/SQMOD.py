@@ -30,11 +30,6 @@ class SqMod(BaseFiletype):
     
     build_elements = [SqModBuildElement]
     filetype_id = "sqmod"
-    
-    @staticmethod
-    def checkIfMatch(path, filename):
-        if os.path.split(path)[-1] == 'script64' and os.path.splitext(filename)[-1] == '.sqmod':
-            return True
-        else:
-            return False
+    extensions = (".sqmod",)
+    parent_dirs = ("script64",)
     
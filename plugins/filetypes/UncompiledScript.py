@@ -41,10 +41,5 @@ class UncompiledScript(BaseFiletype):
     build_elements = [UncompiledScriptBuildElement]
     filetype_id =  sys.intern("script_src")
     filepack = sys.intern("Script")
-    
-    @staticmethod
-    def checkIfMatch(path, filename):
-        if os.path.split(path)[-1] == 'script64' and os.path.splitext(filename)[-1] == '.txt':
-            return True
-        else:
-            return False
+    extensions = (".txt",)
+    parent_dirs = ("script64",)
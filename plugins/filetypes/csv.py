@@ -1,4 +1,3 @@
-import os
 from src.CoreOperations.PluginLoaders.FiletypesPluginLoader import BaseBuildElement, BaseFiletype
 
 class CSVFileBuildElement(BaseBuildElement):
@@ -31,10 +30,8 @@ class CSVFile(BaseFiletype):
     build_elements = [CSVFileBuildElement]
     filetype_id = "csv"
     filepack = "CSV"
+    extensions = (".csv",)
     
     @staticmethod
-    def checkIfMatch(path, filename):
-        if os.path.split(path)[-1].split('.')[-1] != 'mbe' and os.path.splitext(filename)[-1] == '.csv':
-            return True
-        else:
-            return False
+    def checkIfParentDirMatch(parent_dir):
+        return parent_dir.split('.')[-1] != 'mbe'
@@ -4,6 +4,7 @@ import os
 from src.CoreOperations.PluginLoaders.RulesPluginLoader import get_rule_plugins
 from src.Utils.MBE import mbetable_to_dict, dict_to_mbetable
 from src.Utils.Settings import default_csv_encoding
+from src.Utils.TableCache import get_table_cache
 from plugins.patchers import BasePatcher, UniversalDataPack
 
 with open(os.path.join("data", "config", "mberecord_idsizes.json"), 'r') as F:
@@ -40,7 +41,7 @@ class CSVPatcher(BasePatcher):
             if os.path.exists(csv_resource):
                 table_source = csv_resource
                 id_len = id_lengths.get(os.path.join(self.filepack.get_resource_targets()[0], file_target), 1)
-                header, working_table = mbetable_to_dict({}, table_source, id_len, None, None, encoding=default_csv_encoding)
+                header, working_table = get_table_cache(self.paths.table_cache_loc).get_dict(table_source, id_len, encoding=default_csv_encoding)
             else:
                 step_1 = pipeline[0]
                 table_source = os.path.join(self.paths.mm_root, step_1.mod, step_1.src)
@@ -58,6 +59,7 @@ class CSVPatcher(BasePatcher):
             build_data.target = file_target
             build_data.build_target = cached_file
             build_data.backups_loc = self.paths.backups_loc
+            build_data.toc_cache_loc = self.paths.mdb1_toc_cache_loc
                 
             build_data.csv_data = working_table
             build_data.encoding = default_csv_encoding
@@ -1,9 +1,10 @@
 import json
 import os
-import shutil
 
 from src.CoreOperations.PluginLoaders.RulesPluginLoader import get_rule_plugins
-from src.Utils.MBE import mbetable_to_dict, dict_to_mbetable
+from src.Utils.EXPA import pack_mbe
+from src.Utils.MBE import mbetable_to_dict, dict_to_mbetable_rows
+from src.Utils.TableCache import get_table_cache
 from src.Utils.Settings import default_encoding
 
 from plugins.patchers import BasePatcher
@@ -32,20 +33,20 @@ class MBEPatcher(BasePatcher):
         try:
             file_targets = set(self.filepack.get_file_targets())
             source_tables = set()
+            # Tables are held in memory as {table_name: (header, rows)} and
+            # packed straight into the MBE, rather than round-tripping
+            # through CSVs in the build directory
+            tables = {}
+            table_cache = get_table_cache(self.paths.table_cache_loc)
             
-            # Copy all tables that don't need to be built
+            # Load all tables that don't need to be built
             mbe_resource = os.path.join(self.paths.base_resources_loc, self.filepack.get_resource_targets()[0])
-            # dst needs to have the archive name inserted
-            dst = os.path.join(self.paths.patch_build_loc, self.filepack.get_resource_targets()[0])
-            
-            os.makedirs(dst, exist_ok=True)
             if os.path.isdir(mbe_resource):
                 for file in os.listdir(mbe_resource):
                     source_tables.add(os.path.join(self.filepack.get_resource_targets()[0], file))
                     if os.path.join(self.filepack.get_resource_targets()[0], file) not in file_targets:
                         table_path = os.path.join(mbe_resource, file)
-                        file_dst = os.path.join(dst, file)
-                        shutil.copy2(table_path, file_dst)
+                        tables[os.path.splitext(file)[0]] = table_cache.get_rows(table_path)
     
             os.makedirs(os.path.split(cached_file)[0], exist_ok=True)  
             
@@ -56,6 +57,7 @@ class MBEPatcher(BasePatcher):
             build_data.encoding = default_encoding
             build_data.target = cached_file
             build_data.backups_loc = self.paths.backups_loc
+            build_data.toc_cache_loc = self.paths.mdb1_toc_cache_loc
             
             # Iterate over targets; build each target
             for file_target, pipeline in zip(self.filepack.get_file_targets(), self.filepack.build_pipelines):        
@@ -63,7 +65,7 @@ class MBEPatcher(BasePatcher):
                 # Load the table to be patched into memory
                 if file_target in source_tables:
                     table_source = os.path.join(self.paths.base_resources_loc, file_target)
-                    header, working_table = mbetable_to_dict({}, table_source, id_len, None, None)
+                    header, working_table = table_cache.get_dict(table_source, id_len)
                 else:
                     step_1 = pipeline[0]
                     table_source = os.path.join(self.paths.mm_root, step_1.mod, step_1.src)
@@ -90,11 +92,11 @@ class MBEPatcher(BasePatcher):
                     
                     MBEPatcher.rules[build_step.rule](build_data)
                     
-                abs_filepath = os.path.join(dst, os.path.split(file_target)[1])
-                dict_to_mbetable(abs_filepath, header, build_data.csv_data)
+                table_name = os.path.splitext(os.path.split(file_target)[1])[0]
+                tables[table_name] = (header, dict_to_mbetable_rows(build_data.csv_data))
             # Pack into the pack target
-    
-            self.filepack.pack(dst, cached_file)
+            with open(cached_file, 'wb') as F:
+                F.write(pack_mbe(self.filepack.get_pack_targets()[0], tables))
             self.filepack.set_build_pipelines(None)
     
             # Do any post actions, such as compressing the file
@@ -104,4 +106,3 @@ class MBEPatcher(BasePatcher):
             if os.path.exists(cached_file):
                 os.remove(cached_file)
             raise e
-            
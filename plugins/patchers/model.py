@@ -135,6 +135,7 @@ class ModelPatcher(BasePatcher):
         build_data.cache_loc = os.path.join(self.paths.patch_cache_loc, self.path_prefix)
         build_data.archives_loc = self.paths.game_resources_loc
         build_data.backups_loc = self.paths.backups_loc
+        build_data.toc_cache_loc = self.paths.mdb1_toc_cache_loc
         
     def assign_basic_step_pack_data(self, build_data, build_step):
         build_data.source = os.path.join(self.paths.mm_root, build_step.mod, build_step.src)
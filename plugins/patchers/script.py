@@ -51,6 +51,7 @@ class ScriptPatcher(BasePatcher):
             build_data.source_code = source_code
             build_data.softcode_lookup = self.softcode_lookup
             build_data.backups_loc = self.paths.backups_loc
+            build_data.toc_cache_loc = self.paths.mdb1_toc_cache_loc
                 
             # Now iterate over build steps
             for build_step in pipeline:
@@ -32,6 +32,7 @@ class UncategorisedPatcher(BasePatcher):
             build_data.cache_loc = os.path.join(self.paths.patch_cache_loc, self.path_prefix)
             build_data.archives_loc = self.paths.game_resources_loc
             build_data.backups_loc = self.paths.backups_loc
+            build_data.toc_cache_loc = self.paths.mdb1_toc_cache_loc
             
             for build_step in build_pipeline:
                 build_data.source = os.path.join(self.paths.mm_root, build_step.mod, build_step.src)
@@ -1,4 +1,4 @@
-from src.Utils.MBE import mbetable_to_dict
+from src.Utils.MBE import mbetable_to_dict, merge_records, append_records, remove_records
 from src.Utils.Settings import default_encoding
 #from CoreOperations.PluginLoaders.RulesPluginLoader import RuleBase
 
@@ -22,11 +22,7 @@ class mberecord_merge:
         header, _ = mbetable_to_dict(data, filepath, id_len, softcodes, softcode_lookup, encoding)
         max_records = len(header) - id_len
         
-        for key, value in data.items():
-            if key in result:
-                result[key] = [(result[key][i] if subval == "" else subval) for i, subval in enumerate(value)][:max_records]
-            else:
-                result[key] = value[:max_records]
+        merge_records(result, data, max_records)
         
         build_data.csv_data = result
             
@@ -72,14 +68,7 @@ class mberecord_append:
         header, data = mbetable_to_dict({}, filepath, id_len, softcodes, softcode_lookup, encoding)
         
         max_records = len(header) - id_len
-        for key, value in data.items():
-            nonzero_data = [elem for elem in result.get(key, []) if elem != fill_value]
-            new_data = [elem for elem in data[key] if elem not in nonzero_data]
-            nonzero_data.extend(new_data)
-            nonzero_data = nonzero_data[:max_records]
-            
-            nonzero_data.extend([fill_value]*(max_records - len(nonzero_data)))
-            result[key] = nonzero_data[:max_records]
+        append_records(result, data, max_records, fill_value)
             
         build_data.csv_data = result
 
@@ -102,12 +91,7 @@ class mberecord_remove:
         header, data = mbetable_to_dict({}, filepath, id_len, softcodes, softcode_lookup, encoding)
         
         max_records = len(header) - id_len
-        for key, value in data.items():
-            remove_elems = data[key]
-            nonzero_data = [elem for elem in result.get(key, []) if (elem != fill_value) or (elem not in remove_elems)]
-            
-            nonzero_data.extend([fill_value]*(max_records - len(nonzero_data)))
-            result[key] = nonzero_data[:max_records]
+        remove_records(result, data, max_records, fill_value)
         
         build_data.csv_data = result
         
@@ -1,11 +1,8 @@
-import json
 import os
 
+from src.Utils.Filelist import get_filelist_index
+from src.Utils.MDB1 import MDB1ArchiveReader, get_mdb1_toc_cache
 from src.Utils.Settings import default_encoding
-from libs.dscstools import DSCSTools
-
-with open(os.path.join("data", "config", "filelist.json"), 'r') as F:
-    file_list = json.load(F)
 
 all_archives = set(["DSDB", "DSDBA", "DSDBS", "DSDBSP", "DSDBP",
                     "DSDBbgm", "DSDBPDSEbgm", 
@@ -27,6 +24,7 @@ class request_file:
         target      = build_data.target
         archive_loc = build_data.archives_loc
         backup_loc  = build_data.backups_loc
+        toc_loc     = build_data.toc_cache_loc
         request_src = os.path.splitext(src)[0]
         
         archive = None
@@ -42,7 +40,7 @@ class request_file:
                     
                     
         if archive is None:
-            archive = file_list[request_src]
+            archive = get_filelist_index(os.path.join("data", "config"))[request_src]
         try:
             backup_archive = os.path.join(backup_loc, archive + ".steam.mvgl")
             archive_path = os.path.join(archive_loc, archive + ".steam.mvgl")
@@ -53,24 +51,20 @@ class request_file:
             else:
                 raise FileNotFoundError(f"Unable to locate {archive}.steam.mvgl. Have you deleted it?")
                 
-            # In case a the same request gets pulled twice..
-            # extract to a folder unique to the target
-            outpath = os.path.normpath(os.path.join(cache_loc, target + "_request"))
-            os.makedirs(outpath, exist_ok=True)
-            DSCSTools.extractMDB1File(get_path, outpath, request_src, True)
+            toc = get_mdb1_toc_cache(toc_loc).get_toc(get_path)
+            with MDB1ArchiveReader(get_path, toc) as reader:
+                data = reader.read_file(request_src)
         except FileNotFoundError as e:
             raise e
         except Exception as e:
             raise ValueError(f"Request file \'{request_src}\' not in vanilla archive \'{archive}.steam.mvgl\', source file is \'{source}\'.") from e
         
-        extract_path = os.path.join(outpath, request_src)
+        # In case the same request gets pulled twice, write to a file unique
+        # to the target and only keep the first
         target_path = os.path.join(cache_loc, target)
         if not os.path.exists(target_path):
-            os.rename(extract_path, target_path)
-        else:
-            os.remove(extract_path)
-        
-        # Deletes the folders created with the extractMDB1File line
-        dirs = os.path.normpath(request_src).split(os.path.sep)
-        for i in range(len(dirs)):
-            os.rmdir(os.path.join(outpath, *dirs[:-(i+1)]))
\ No newline at end of file
+            os.makedirs(os.path.split(target_path)[0], exist_ok=True)
+            tmp_path = os.path.normpath(os.path.join(cache_loc, target + "_request"))
+            with open(tmp_path, 'wb') as F:
+                F.write(data)
+            os.replace(tmp_path, target_path)
\ No newline at end of file
@@ -1,5 +1,7 @@
 import os
-import shutil
+
+from src.Utils.FileLinks import clone_file
+from src.Utils.Verification import record_snapshots
 
 
 class BackupsManager:
@@ -94,23 +96,31 @@ class BackupsManager:
                   "text/authorization/us/privacy_policy.txt"
                 }
     
+    # Backups are made as reflinks of the game files where the filesystem
+    # supports them, so backing up an archive costs no time or space until
+    # the game file is replaced; otherwise they are full copies.
     @staticmethod
-    def replace_backed_up_file(src, dst, dst_folder, backup_folder):
+    def replace_backed_up_file(src, dst, dst_folder, backup_folder, snapshot_store_loc=None):
         if os.path.exists(dst):
-            rel_filepath = os.path.relpath(dst, dst_folder)
-            backup_dst = os.path.normpath(os.path.join(backup_folder, rel_filepath))
-            if not os.path.exists(backup_dst):
-                os.makedirs(os.path.split(backup_dst)[0], exist_ok=True)
-                shutil.copy2(dst, backup_dst)
-        shutil.copy2(src, dst)
+            BackupsManager.try_back_up_file(dst, dst_folder, backup_folder, snapshot_store_loc)
+        clone_file(src, dst)
         
     @staticmethod
-    def try_back_up_file(dst, dst_folder, backup_folder):
+    def try_back_up_file(dst, dst_folder, backup_folder, snapshot_store_loc=None):
+        """
+        If a snapshot store is given, the new backup is snapshotted as soon
+        as it is made, so that later verification is against the file as it
+        was backed up.
+        """
         rel_filepath = os.path.relpath(dst, dst_folder)
         backup_dst = os.path.normpath(os.path.join(backup_folder, rel_filepath))
         if not os.path.exists(backup_dst):
-            os.makedirs(os.path.split(backup_dst)[0], exist_ok=True)
-            shutil.copy2(dst, backup_dst)
+            clone_file(dst, backup_dst)
+            if os.path.getsize(backup_dst) != os.path.getsize(dst):
+                os.remove(backup_dst)
+                raise OSError(f"Backing up {dst} produced a file of the wrong size.")
+            if snapshot_store_loc is not None:
+                record_snapshots(snapshot_store_loc, backup_folder, [backup_dst], installed=False)
     
         
     @staticmethod
@@ -118,7 +128,36 @@ class BackupsManager:
         rel_filepath = os.path.relpath(dst, dst_folder)
         backup_dst = os.path.normpath(os.path.join(backup_folder, rel_filepath))
         if os.path.exists(backup_dst):
-            shutil.copy2(backup_dst, dst)
+            clone_file(backup_dst, dst)
+            
+    @staticmethod
+    def files_match(backup_file, game_file, digest_store):
+        if not os.path.isfile(game_file):
+            return False
+        if os.path.samefile(backup_file, game_file):
+            return True
+        if os.path.getsize(backup_file) != os.path.getsize(game_file):
+            return False
+        return digest_store.get_digest(backup_file) == digest_store.get_digest(game_file)
+            
+    @staticmethod
+    def restore_backups(dst_folder, backup_folder, digest_store):
+        """
+        Restores every backed-up file that differs from the file in the game,
+        and returns the number of files (restored, already matching).
+        """
+        n_restored = 0
+        n_matching = 0
+        for root, _, files in os.walk(backup_folder):
+            for file in files:
+                backup_file = os.path.join(root, file)
+                game_file = os.path.normpath(os.path.join(dst_folder, os.path.relpath(backup_file, backup_folder)))
+                if BackupsManager.files_match(backup_file, game_file, digest_store):
+                    n_matching += 1
+                else:
+                    clone_file(backup_file, game_file)
+                    n_restored += 1
+        return n_restored, n_matching
             
     @staticmethod
     def get_backed_up_filepath_if_exists(dst, dst_folder, backup_folder):
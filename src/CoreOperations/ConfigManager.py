@@ -11,6 +11,7 @@ class ConfigManager:
                  "__style_pref",
                  "__crash_pref", 
                  "__block_pref", 
+                 "__multiprocess_pref",
                  "__first_time_launch",
                  "paths",
                  "ui")
@@ -23,6 +24,7 @@ class ConfigManager:
         self.__style_pref = None
         self.__crash_pref = 0
         self.__block_pref = 0
+        self.__multiprocess_pref = False
         self.__first_time_launch = False
         self.paths = None
 
@@ -63,6 +65,13 @@ class ConfigManager:
     def get_block_pref(self):
         return self.__block_pref
     
+    def set_multiprocess_pref(self, pref):
+        self.__multiprocess_pref = pref
+        if self.init: self.write_config()
+        
+    def get_multiprocess_pref(self):
+        return self.__multiprocess_pref
+    
     def get_first_time_launch(self):
         return self.__first_time_launch
     
@@ -86,6 +95,7 @@ class ConfigManager:
             self.__style_pref = None
             self.__crash_pref = 0
             self.__block_pref = 0
+            self.__multiprocess_pref = False
             self.__first_time_launch = False
             
     def read_config(self):
@@ -95,6 +105,7 @@ class ConfigManager:
             self.__style_pref        = config_data.get("style")
             self.__crash_pref        = config_data.get("crash_pref", 0)
             self.__block_pref        = config_data.get("block_pref", 0)
+            self.__multiprocess_pref = config_data.get("multiprocess_patchers", False)
             self.__first_time_launch = config_data.get("first_time_launch", False)
             
     def write_config(self):
@@ -105,6 +116,7 @@ class ConfigManager:
                 'style'            : self.__style_pref,
                 'crash_pref'       : self.__crash_pref,
                 'block_pref'       : self.__block_pref,
+                'multiprocess_patchers': self.__multiprocess_pref,
                 'first_time_launch': self.__first_time_launch
             }
             json.dump(out_data, F, indent=4)
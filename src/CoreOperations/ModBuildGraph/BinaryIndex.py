@@ -0,0 +1,257 @@
+import json
+import os
+import struct
+import sys
+
+
+# INDEX.bin is a compact copy of INDEX.json for use at install time.
+# All values are little-endian, and every string is stored once in a string
+# table and referred to by its position in it. Layout:
+#   header         magic, version, and the size of each section
+#   strings        u32 end offset of each string in characters, then the
+#                  UTF-8 data of all strings joined together, with lone
+#                  surrogates (from undecodable filenames) passed through
+#   targets        fixed-width target records
+#   steps          fixed-width build step records
+#   softcodes      fixed-width softcode occurrence records
+#   mod softcodes  u32 string ids
+#   meta           JSON for the rest of the index
+# The file is read in a single call rather than memory-mapped, so that it is
+# never held open while a stale index is being rewritten.
+MAGIC = b"SDMI"
+VERSION = 1
+NO_STRING = 0xFFFFFFFF
+STRING_ERRORS = "surrogatepass"
+
+header_struct   = struct.Struct("<4sI7I")
+target_struct   = struct.Struct("<7I") # archive type, archive, target, step start, step count, softcode start, softcode count
+step_struct     = struct.Struct("<6I") # mod, src, rule, rule args, softcode start, softcode count
+softcode_struct = struct.Struct("<3I") # match, offset, length
+
+
+##########
+# WRITER #
+##########
+class StringTable:
+    __slots__ = ("ids", "strings")
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, string):
+        idx = self.ids.get(string)
+        if idx is None:
+            idx = len(self.strings)
+            self.ids[string] = idx
+            self.strings.append(string)
+        return idx
+
+    def pack(self):
+        ends = []
+        end = 0
+        for string in self.strings:
+            end += len(string)
+            ends.append(end)
+        return struct.pack(f"<{len(ends)}I", *ends), ''.join(self.strings).encode("utf8", STRING_ERRORS)
+
+
+def pack_softcodes(buffer, strings, softcodes):
+    start = len(buffer) // softcode_struct.size
+    for match, offsets in softcodes.items():
+        match_idx = strings.add(match)
+        for offset, length in offsets:
+            buffer += softcode_struct.pack(match_idx, offset, length)
+    return start, len(buffer) // softcode_struct.size - start
+
+
+def write_binary_index(filepath, index, json_filepath):
+    strings = StringTable()
+    targets = bytearray()
+    steps = bytearray()
+    softcodes = bytearray()
+
+    for archive_type, archive_type_data in index["data"].items():
+        archive_type_idx = strings.add(archive_type)
+        for archive, archive_data in archive_type_data.items():
+            archive_idx = strings.add(archive)
+            for target, target_data in archive_data.items():
+                step_start = len(steps) // step_struct.size
+                for entry in target_data["build_steps"]:
+                    rule_args = entry.get("rule_args")
+                    softcode_start, softcode_count = pack_softcodes(softcodes, strings, entry.get("softcodes", {}))
+                    steps += step_struct.pack(strings.add(entry["mod"]),
+                                              strings.add(entry["src"]),
+                                              strings.add(entry["rule"]),
+                                              NO_STRING if rule_args is None else strings.add(json.dumps(rule_args)),
+                                              softcode_start,
+                                              softcode_count)
+                softcode_start, softcode_count = pack_softcodes(softcodes, strings, target_data.get("softcodes", {}))
+                targets += target_struct.pack(archive_type_idx,
+                                              archive_idx,
+                                              strings.add(target),
+                                              step_start,
+                                              len(steps) // step_struct.size - step_start,
+                                              softcode_start,
+                                              softcode_count)
+    mod_softcodes = [strings.add(softcode) for softcode in index["softcodes"]]
+
+    # The binary index is only valid alongside the INDEX.json it was made with
+    json_stat = os.stat(json_filepath)
+    meta = {key: value for key, value in index.items() if key not in ("data", "softcodes", "file_records")}
+    meta["json_stat"] = [json_stat.st_size, json_stat.st_mtime_ns]
+    meta = json.dumps(meta, separators=(',', ':')).encode("utf8")
+
+    string_ends, string_data = strings.pack()
+    tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_filepath, 'wb') as F:
+        F.write(header_struct.pack(MAGIC, VERSION,
+                                   len(strings.strings), len(string_data),
+                                   len(targets) // target_struct.size,
+                                   len(steps) // step_struct.size,
+                                   len(softcodes) // softcode_struct.size,
+                                   len(mod_softcodes),
+                                   len(meta)))
+        F.write(string_ends)
+        F.write(string_data)
+        F.write(targets)
+        F.write(steps)
+        F.write(softcodes)
+        F.write(struct.pack(f"<{len(mod_softcodes)}I", *mod_softcodes))
+        F.write(meta)
+    os.replace(tmp_filepath, filepath)
+
+
+##########
+# READER #
+##########
+class BinaryIndexReader:
+    """
+    Strings are only sliced out of the string table when first used, and
+    build steps are only created as each target is iterated over.
+    """
+    __slots__ = ("data", "buildstep_factory", "string_ends", "string_data", "strings",
+                 "targets_offset", "n_targets", "step_records", "softcode_records")
+
+    def __init__(self, data, buildstep_factory, n_strings, string_data_size, n_targets, n_steps, n_softcodes):
+        self.data = data
+        self.buildstep_factory = buildstep_factory
+        offset = header_struct.size
+        self.string_ends = struct.unpack_from(f"<{n_strings}I", data, offset)
+        offset += 4*n_strings
+        # A single decode is far cheaper than one per string
+        self.string_data = str(data[offset:offset + string_data_size], "utf8", STRING_ERRORS)
+        self.strings = [None]*n_strings
+        offset += string_data_size
+        self.targets_offset = offset
+        self.n_targets = n_targets
+        offset += n_targets*target_struct.size
+        self.step_records = list(struct.iter_unpack(step_struct.format, data[offset:offset + n_steps*step_struct.size]))
+        offset += n_steps*step_struct.size
+        self.softcode_records = list(struct.iter_unpack(softcode_struct.format, data[offset:offset + n_softcodes*softcode_struct.size]))
+
+    def get_string(self, idx):
+        string = self.strings[idx]
+        if string is None:
+            start = self.string_ends[idx - 1] if idx else 0
+            string = sys.intern(self.string_data[start:self.string_ends[idx]])
+            self.strings[idx] = string
+        return string
+
+    def get_softcodes(self, start, count):
+        softcodes = {}
+        for match_idx, offset, length in self.softcode_records[start:start + count]:
+            match = self.get_string(match_idx)
+            if match not in softcodes:
+                softcodes[match] = []
+            softcodes[match].append([offset, length])
+        return softcodes
+
+    def get_build_steps(self, start, count):
+        build_steps = []
+        strings = self.strings
+        get_string = self.get_string
+        buildstep_factory = self.buildstep_factory
+        for mod, src, rule, rule_args, softcode_start, softcode_count in self.step_records[start:start + count]:
+            mod  = strings[mod]  or get_string(mod)
+            src  = strings[src]  or get_string(src)
+            rule = strings[rule] or get_string(rule)
+            softcodes = {match: tuple(offsets) for match, offsets in self.get_softcodes(softcode_start, softcode_count).items()} if softcode_count else None
+            if rule_args == NO_STRING:
+                build_steps.append(buildstep_factory(mod, src, rule, softcodes))
+            else:
+                build_steps.append(buildstep_factory(mod, src, rule, softcodes, *json.loads(get_string(rule_args))))
+        return build_steps
+
+    def get_data(self):
+        data = {}
+        records = self.data[self.targets_offset:self.targets_offset + self.n_targets*target_struct.size]
+        for archive_type, archive, target, step_start, step_count, softcode_start, softcode_count in struct.iter_unpack(target_struct.format, records):
+            archive_type = self.get_string(archive_type)
+            archive = self.get_string(archive)
+            if archive_type not in data:
+                data[archive_type] = {}
+            if archive not in data[archive_type]:
+                data[archive_type][archive] = BinaryIndexTargets(self)
+            data[archive_type][archive].records.append((target, step_start, step_count, softcode_start, softcode_count))
+        return data
+
+
+class BinaryIndexTargets:
+    """
+    Stands in for the {target: target_data} dict of an archive.
+    """
+    __slots__ = ("reader", "records")
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return (self.reader.get_string(record[0]) for record in self.records)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        reader = self.reader
+        for target, step_start, step_count, softcode_start, softcode_count in self.records:
+            target_data = {"build_steps": reader.get_build_steps(step_start, step_count)}
+            if softcode_count:
+                target_data["softcodes"] = reader.get_softcodes(softcode_start, softcode_count)
+            yield reader.get_string(target), target_data
+
+    def values(self):
+        return (target_data for _, target_data in self.items())
+
+
+def read_binary_index(filepath, json_filepath, buildstep_factory):
+    """
+    Returns None if there is no usable binary index, in which case
+    INDEX.json should be read instead.
+    """
+    try:
+        with open(filepath, 'rb') as F:
+            data = F.read()
+        json_stat = os.stat(json_filepath)
+    except OSError:
+        return None
+    if len(data) < header_struct.size:
+        return None
+    magic, version, n_strings, string_data_size, n_targets, n_steps, n_softcodes, n_mod_softcodes, meta_size = header_struct.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    meta_offset = len(data) - meta_size
+    index = json.loads(data[meta_offset:])
+    if index.pop("json_stat") != [json_stat.st_size, json_stat.st_mtime_ns]:
+        return None
+
+    reader = BinaryIndexReader(data, buildstep_factory, n_strings, string_data_size, n_targets, n_steps, n_softcodes)
+    index["data"] = reader.get_data()
+    mod_softcodes_offset = meta_offset - 4*n_mod_softcodes
+    index["softcodes"] = [reader.get_string(idx) for idx in struct.unpack_from(f"<{n_mod_softcodes}I", data, mod_softcodes_offset)]
+    return index
@@ -0,0 +1,77 @@
+import os
+import shutil
+from hashlib import blake2b
+
+from src.Utils.Settings import default_encoding
+
+
+################
+# BLOB STORAGE #
+################
+# Built pack targets are additionally stored under the hash of the pack that
+# produced them, so that identical packs from different profiles share a
+# single artifact and can be restored without a rebuild.
+# Each blob's mtime is bumped whenever it is used, and the least recently
+# used blobs are pruned once the store outgrows MAX_BLOB_STORE_SIZE.
+MAX_BLOB_STORE_SIZE = 2*1024*1024*1024
+
+def get_blob_path(blob_loc, pack_hash, archive_pack_target):
+    hasher = blake2b()
+    hasher.update(pack_hash.encode(default_encoding))
+    hasher.update(archive_pack_target.replace(os.sep, '/').encode(default_encoding))
+    name = hasher.hexdigest()
+    return os.path.join(blob_loc, name[:2], name)
+
+
+def store_blob(blob_loc, pack_hash, archive_pack_target, src):
+    blob_path = get_blob_path(blob_loc, pack_hash, archive_pack_target)
+    if os.path.isfile(blob_path):
+        os.utime(blob_path)
+        return
+    os.makedirs(os.path.split(blob_path)[0], exist_ok=True)
+    tmp_path = blob_path + ".tmp"
+    shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, blob_path)
+
+
+def restore_blob(blob_loc, pack_hash, archive_pack_target, dst):
+    blob_path = get_blob_path(blob_loc, pack_hash, archive_pack_target)
+    if not os.path.isfile(blob_path):
+        return False
+    os.makedirs(os.path.split(dst)[0], exist_ok=True)
+    # Copy rather than link: patchers are allowed to write over the cached
+    # file in-place, which would corrupt a shared blob
+    shutil.copy2(blob_path, dst)
+    os.utime(blob_path)
+    return True
+
+
+def prune_blobs(blob_loc, referenced_blobs, max_size=MAX_BLOB_STORE_SIZE):
+    """
+    Deletes the least recently used blobs until the store fits in max_size,
+    never deleting the blobs in referenced_blobs. Returns the number of
+    blobs deleted.
+    """
+    if not os.path.isdir(blob_loc):
+        return 0
+    blobs = []
+    total_size = 0
+    for root, _, files in os.walk(blob_loc):
+        for file in files:
+            blob_path = os.path.join(root, file)
+            stat = os.stat(blob_path)
+            if os.path.splitext(file)[1] == ".tmp":
+                # Left behind by an interrupted store
+                os.remove(blob_path)
+                continue
+            total_size += stat.st_size
+            if blob_path not in referenced_blobs:
+                blobs.append((stat.st_mtime_ns, stat.st_size, blob_path))
+    n_deleted = 0
+    for _, size, blob_path in sorted(blobs):
+        if total_size <= max_size:
+            break
+        os.remove(blob_path)
+        total_size -= size
+        n_deleted += 1
+    return n_deleted
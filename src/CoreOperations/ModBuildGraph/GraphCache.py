@@ -0,0 +1,111 @@
+import os
+import pickle
+
+
+class BuildGraphCache:
+    """
+    Holds the build steps each mod contributes to each target, alongside
+    the categorised and trimmed pipeline of every target, between installs.
+    Only the targets touched by a mod that has changed - or by a change in
+    the order of the mods - need to be categorised again, and the indices
+    of unchanged mods never need to be walked.
+    Targets are keyed by (archive type, archive, target). Each profile has
+    its own cache, so that switching between profiles does not re-order
+    the mods of a single cache.
+    """
+    __slots__ = ("filepath", "plugin_signature", "mod_order", "mod_tokens", "mod_targets", "mod_softcodes", "contributions", "categorised")
+
+    version = 1
+
+    def __init__(self, filepath, plugin_signature):
+        self.filepath = filepath
+        self.plugin_signature = plugin_signature
+        self.mod_order = []
+        self.mod_tokens = {}
+        self.mod_targets = {}
+        self.mod_softcodes = {}
+        self.contributions = {}
+        self.categorised = {}
+
+    @classmethod
+    def load(cls, filepath, plugin_signature):
+        instance = cls(filepath, plugin_signature)
+        if not os.path.isfile(filepath):
+            return instance
+        try:
+            with open(filepath, 'rb') as F:
+                version, cached_signature, state = pickle.load(F)
+        except Exception:
+            # Just rebuild the graph from scratch
+            return instance
+        # Different plugins may categorise targets differently
+        if version != cls.version or cached_signature != plugin_signature:
+            return instance
+        instance.mod_order, instance.mod_tokens, instance.mod_targets, instance.mod_softcodes, instance.contributions, instance.categorised = state
+        return instance
+
+    def save(self):
+        os.makedirs(os.path.split(self.filepath)[0], exist_ok=True)
+        state = (self.mod_order, self.mod_tokens, self.mod_targets, self.mod_softcodes, self.contributions, self.categorised)
+        tmp_filepath = f"{self.filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, 'wb') as F:
+            pickle.dump((self.version, self.plugin_signature, state), F, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filepath, self.filepath)
+
+    def remove_mod(self, mod_path):
+        """
+        Returns the targets the mod contributed to.
+        """
+        self.mod_tokens.pop(mod_path, None)
+        self.mod_softcodes.pop(mod_path, None)
+        targets = self.mod_targets.pop(mod_path, [])
+        for key in targets:
+            contributions = self.contributions.get(key)
+            if contributions is not None:
+                contributions.pop(mod_path, None)
+                if not len(contributions):
+                    del self.contributions[key]
+        return targets
+
+    def update_mod(self, mod_path, token, index):
+        """
+        Replaces the contributions of the mod with those in its index, and
+        returns every target that was or is now contributed to by the mod.
+        """
+        dirty_targets = set(self.remove_mod(mod_path))
+        targets = []
+        index_data = index["data"]
+        for archive_type in index_data:
+            for archive in index_data[archive_type]:
+                for target, target_data in index_data[archive_type][archive].items():
+                    key = (archive_type, archive, target)
+                    targets.append(key)
+                    if key not in self.contributions:
+                        self.contributions[key] = {}
+                    self.contributions[key][mod_path] = (target_data.get("softcodes"), target_data["build_steps"])
+        dirty_targets.update(targets)
+        self.mod_tokens[mod_path] = token
+        self.mod_targets[mod_path] = targets
+        self.mod_softcodes[mod_path] = list(index["softcodes"])
+        return dirty_targets
+
+    def get_merged_pipeline(self, key, mod_positions):
+        """
+        Returns the softcodes and build steps of the target across all mods,
+        in mod order. Only the first mod to provide the target can softcode
+        it.
+        """
+        contributions = self.contributions[key]
+        mod_paths = sorted(contributions, key=mod_positions.__getitem__)
+        build_steps = [build_step for mod_path in mod_paths for build_step in contributions[mod_path][1]]
+        return contributions[mod_paths[0]][0], build_steps
+
+    def get_ordered_targets(self):
+        """
+        Returns every target in the order they are first provided by a mod.
+        """
+        ordered_targets = {}
+        for mod_path in self.mod_order:
+            for key in self.mod_targets[mod_path]:
+                ordered_targets[key] = None
+        return list(ordered_targets)
@@ -1,14 +1,17 @@
 import os
 import sys
+from hashlib import blake2b
 
 from PyQt5 import QtCore
 
+from src.CoreOperations.ModBuildGraph.BinaryIndex import read_binary_index
+from src.CoreOperations.ModBuildGraph.GraphCache import BuildGraphCache
 from src.CoreOperations.ModBuildGraph.graphHash import hashFilepack
 from src.CoreOperations.PluginLoaders.RulesPluginLoader import get_rule_plugins
-from src.CoreOperations.PluginLoaders.FiletypesPluginLoader import get_targettable_filetypes
+from src.CoreOperations.PluginLoaders.FiletypesPluginLoader import get_targettable_filetype_dispatcher
 from src.CoreOperations.PluginLoaders.ArchivesPluginLoader import get_archivetype_plugins_dict
 from src.CoreOperations.PluginLoaders.FilePacksPluginLoader import get_filepack_plugins_dict, get_filetype_to_filepack_plugins_map
-from src.Utils.Path import calc_has_dir_changed_info
+from src.Utils.Path import calc_has_dir_changed_info, has_dir_changed_since_snapshot
 from src.Utils.JSONHandler import JSONHandler
 
 
@@ -27,7 +30,8 @@ class BuildStep:
         
 
 def make_interned_buildstep(dct):
-    if 'mod' in dct:
+    # Other dicts in the index are keyed by filenames, which could be 'mod'
+    if 'mod' in dct and 'rule' in dct:
         softcodes = dct.get('softcodes', {})
         return BuildStep(sys.intern(dct['mod']),
                          sys.intern(dct['src']),
@@ -42,6 +46,9 @@ def make_interned_buildstep(dct):
 
 
 def get_interned_mod_index(path):
+    index = read_binary_index(os.path.join(path, "INDEX.bin"), os.path.join(path, "INDEX.json"), BuildStep)
+    if index is not None:
+        return index
     with JSONHandler(os.path.join(path, "INDEX.json"), "Error reading 'INDEX.json'", object_hook=make_interned_buildstep) as stream:
         return stream
 
@@ -87,58 +94,84 @@ def trim_dead_nodes(build_pipeline, rules):
     return list(steps)
 
 
-def categorise_build_targets(build_graphs, ops, log, updateLog):
-    filetypes = get_targettable_filetypes()
-    filepacks = get_filepack_plugins_dict()
-    rules = get_rule_plugins()
+def get_plugin_signature(filetype_dispatcher, filepacks, rules):
+    """
+    Identifies each plugin by name and by the size and mtime of its source
+    file, so that editing a plugin invalidates the categorisations made
+    with it.
+    """
+    signature = []
+    for plugin in [*filetype_dispatcher.filetypes, *filepacks.values(), *rules.values()]:
+        module_file = getattr(sys.modules.get(plugin.__module__), "__file__", None)
+        if module_file is not None and os.path.isfile(module_file):
+            stat = os.stat(module_file)
+            source_token = (stat.st_size, stat.st_mtime_ns)
+        else:
+            source_token = None
+        signature.append((f"{plugin.__module__}.{plugin.__qualname__}", source_token))
+    return tuple(signature)
 
-    log(translate("BuildGraph", "Categorising install graph pipelines..."))
 
-    total_pipes = 0
-    for archive_type in build_graphs:
-        for archive in build_graphs[archive_type]:
-            total_pipes += len(build_graphs[archive_type][archive].build_graph)
-            
-    total = 0
+def get_graph_cache_filename(profile_name):
+    # Profile names can contain anything, so aren't used as filenames
+    return blake2b(profile_name.encode("utf8"), digest_size=8).hexdigest() + ".pickle"
+
+
+def get_index_token(path):
+    stat = os.stat(os.path.join(path, "INDEX.json"))
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def categorise_target(target, build_steps, filetype_dispatcher, filepacks, rules):
+    """
+    Returns the filepack group and filepack name of the target along with
+    its trimmed build steps, or None if no build steps survive trimming.
+    """
+    group = filetype_dispatcher.get_filetype(*os.path.split(target)).filepack
+        
+    # Remove any build steps that require pre-existing data that
+    # doesn't exist
+    build_steps = trim_dead_nodes(build_steps, rules)
+    # If that means no build steps are left, don't build that target
+    if not len(build_steps):
+        return None
+
+    pack = filepacks[group]
+    return pack.filepack, sys.intern(pack.make_packname(target)), build_steps
+
+
+def assemble_build_graphs(graph_cache, archive_type_classes, filepacks, ops):
+    build_graphs = {}
+    for key in graph_cache.get_ordered_targets():
+        archive_type, archive, target = key
+        if archive_type not in build_graphs:
+            build_graphs[archive_type] = {}
+        archive_type_build_graph = build_graphs[archive_type]
+        if archive not in archive_type_build_graph:
+            archive_type_build_graph[archive] = archive_type_classes[archive_type](archive, ops)
+            archive_type_build_graph[archive].build_graph = {filepack: {} for filepack in filepacks}
+        
+        categorisation = graph_cache.categorised[key]
+        if categorisation is None:
+            continue
+        packgroup, filepack_name, softcodes, build_steps = categorisation
+        
+        # Collect file targets into filepacks
+        retval = archive_type_build_graph[archive].build_graph
+        if filepack_name not in retval[packgroup]:
+            retval[packgroup][filepack_name] = filepacks[packgroup](filepack_name)
+        target_data = {'build_steps': list(build_steps)}
+        if softcodes is not None:
+            target_data['softcodes'] = softcodes
+        retval[packgroup][filepack_name].add_file(target, target_data)
+
+    # Cull any unused plugin types
     for archive_type in build_graphs:
         for archive in build_graphs[archive_type]:
-            archive_build_graph = build_graphs[archive_type][archive].build_graph
-            retval = {filepack: {} for filepack in filepacks}
-            
-            # Collect file targets into filepacks
-            for target in list(archive_build_graph.keys()):
-                total += 1
-                group = 'Uncategorised'
-                for filetype in filetypes:
-                    if filetype.checkIfMatch(*os.path.split(target)):
-                        group = filetype.filepack
-                        break
-                    
-                # Remove any build steps that require pre-existing data that
-                # doesn't exist
-                archive_build_graph[target]["build_steps"] = trim_dead_nodes(archive_build_graph[target]["build_steps"], rules)
-                # If that means no build steps are left, don't build that target
-                if not len(archive_build_graph[target]["build_steps"]):
-                    continue
-            
-                pack = filepacks[group]
-                packgroup = pack.filepack
-                filepack_name = sys.intern(pack.make_packname(target))
-                
-                if filepack_name not in retval[packgroup]:
-                    retval[packgroup][filepack_name] = pack(filepack_name)
-                retval[packgroup][filepack_name].add_file(target, archive_build_graph.pop(target))
-            # Cull any unused plugin types; hash pipes
+            retval = build_graphs[archive_type][archive].build_graph
             for packgroup in list(retval.keys()):
                 if not len(retval[packgroup]):
                     del retval[packgroup]
-                # else:
-                #     for pack in retval[packgroup].values():
-                #         pack.hash = hashFilepack(ops.paths.mm_root, pack)
-                        
-            # Replace build graph with filepack version
-            build_graphs[archive_type][archive].build_graph = retval
-    updateLog(translate("BuildGraph", "Categorising install graph pipelines... Done. ") + f"[{total}/{total_pipes}]")
     return build_graphs
 
 
@@ -166,9 +199,16 @@ class ModBuildGraphCreator:
             updateLog(translate("BuildGraph", "Creating missing mod indices... Done. ") + f"[{i+1}/{n_missing_mods}]")
             
     def regenerate_index_if_out_of_date(self, index, path, updateLog, msg):
-        latest_edit_time, contents_hash = calc_has_dir_changed_info(os.path.relpath(os.path.join(path, "modfiles")))
+        modfiles_path = os.path.relpath(os.path.join(path, "modfiles"))
+        stat_snapshot = index.get("stat_snapshot")
+        if stat_snapshot is not None:
+            is_out_of_date = has_dir_changed_since_snapshot(modfiles_path, stat_snapshot)
+        else:
+            # Indices from older versions have no snapshot to compare against
+            latest_edit_time, contents_hash = calc_has_dir_changed_info(modfiles_path)
+            is_out_of_date = latest_edit_time != index["last_edit_time"] or contents_hash != index["contents_hash"]
         
-        if latest_edit_time != index["last_edit_time"] or contents_hash != index["contents_hash"]:
+        if is_out_of_date:
             updateLog(translate("BuildGraph", "{msg} [Regenerating index...]").format(msg=msg))
             self.ops.mod_registry.save_index(path, self.ops.mod_registry.index_mod(path))
             return get_interned_mod_index(path)
@@ -177,9 +217,19 @@ class ModBuildGraphCreator:
             
     def create_build_graph(self, active_mods, log, updateLog):
         archive_type_classes = get_archivetype_plugins_dict()
+        filetype_dispatcher = get_targettable_filetype_dispatcher()
+        filepacks = get_filepack_plugins_dict()
+        rules = get_rule_plugins()
         self.regenerate_missing_mod_indices(active_mods, log, updateLog)
-        build_graphs = {}
-        mod_softcodes = []
+        
+        # The merged graph of each profile is cached between installs; only
+        # the targets of mods that have changed since the last install of
+        # the profile are recomputed
+        graph_cache_dir = self.ops.paths.build_graph_cache_loc
+        graph_cache_path = os.path.join(graph_cache_dir, get_graph_cache_filename(self.ops.profile_manager.get_active_profile_name()))
+        graph_cache = BuildGraphCache.load(graph_cache_path, get_plugin_signature(filetype_dispatcher, filepacks, rules))
+        mod_paths = [mod.path for mod in active_mods]
+        dirty_targets = set()
         log(translate("BuildGraph::Debug", "---build graph message slot---"))
         n = len(active_mods)
         for i, mod in enumerate(active_mods):
@@ -189,35 +239,40 @@ class ModBuildGraphCreator:
             index = self.regenerate_index_if_out_of_date(index, mod.path, updateLog, msg)
             updateLog(msg)
             
-            # Handle contents data
-            index_data = index["data"]
-            for archive_type in index_data:
-                if archive_type not in build_graphs:
-                    build_graphs[archive_type] = {}
-                archive_type_build_graph = build_graphs[archive_type]
-                archive_type_cls = archive_type_classes[archive_type]
-                for archive in index_data[archive_type]:
-                    if archive not in archive_type_build_graph:
-                        archive_type_build_graph[archive] = archive_type_cls(archive, self.ops)
-                        
-                    archive_build_graph = archive_type_build_graph[archive].build_graph
-                    for target, target_data in index_data[archive_type][archive].items():
-                        build_steps = target_data["build_steps"]
-                        
-                        sys.intern(target)
-                        if target not in archive_build_graph:
-                            archive_build_graph[target] = {'build_steps': []}
-                            if 'softcodes' in target_data:
-                                archive_build_graph[target]['softcodes'] = target_data['softcodes']
-    
-                        archive_build_graph[target]['build_steps'].extend(build_steps)
-            
-            # Handle softcodes
-            softcode_data = index["softcodes"]
-            # for category, keys in softcode_data.items():
-            #     if category not in mod_softcodes:
-            #         mod_softcodes[category] = []
-            mod_softcodes.extend(softcode_data)
-                
+            token = get_index_token(mod.path)
+            if graph_cache.mod_tokens.get(mod.path) != token:
+                dirty_targets.update(graph_cache.update_mod(mod.path, token, index))
+        for mod_path in list(graph_cache.mod_tokens):
+            if mod_path not in mod_paths:
+                dirty_targets.update(graph_cache.remove_mod(mod_path))
+        # Every pipeline is merged in mod order, so re-ordering the mods
+        # affects all of them
+        if graph_cache.mod_order != mod_paths:
+            dirty_targets.update(graph_cache.contributions.keys())
+            graph_cache.mod_order = mod_paths
         updateLog(translate("BuildGraph", "Building install graph nodes... Done. ") + f"[{i+1}/{n}]")
-        return categorise_build_targets(build_graphs, self.ops, log, updateLog), mod_softcodes
+
+        log(translate("BuildGraph", "Categorising install graph pipelines..."))
+        mod_positions = {mod_path: i for i, mod_path in enumerate(mod_paths)}
+        for key in dirty_targets:
+            if key not in graph_cache.contributions:
+                graph_cache.categorised.pop(key, None)
+                continue
+            softcodes, build_steps = graph_cache.get_merged_pipeline(key, mod_positions)
+            categorisation = categorise_target(key[2], build_steps, filetype_dispatcher, filepacks, rules)
+            if categorisation is None:
+                graph_cache.categorised[key] = None
+            else:
+                packgroup, filepack_name, build_steps = categorisation
+                graph_cache.categorised[key] = (packgroup, filepack_name, softcodes, build_steps)
+        graph_cache.save()
+        # Drop the graphs of any profiles that have since been deleted
+        live_graph_caches = {get_graph_cache_filename(profile_name) for profile_name in self.ops.profile_manager.get_profile_names()}
+        for file in os.listdir(graph_cache_dir):
+            if os.path.splitext(file)[1] == ".pickle" and file not in live_graph_caches:
+                os.remove(os.path.join(graph_cache_dir, file))
+        build_graphs = assemble_build_graphs(graph_cache, archive_type_classes, filepacks, self.ops)
+        updateLog(translate("BuildGraph", "Categorising install graph pipelines... Done. ") + f"[{len(dirty_targets)}/{len(graph_cache.categorised)}]")
+        
+        mod_softcodes = [softcode for mod_path in mod_paths for softcode in graph_cache.mod_softcodes[mod_path]]
+        return build_graphs, mod_softcodes
@@ -2,7 +2,7 @@ import os
 from hashlib import blake2b
 from src.Utils.Settings import default_encoding
 
-def hashFilepack(mm_root, filepack, softcode_lookup):
+def hashFilepack(mm_root, filepack, softcode_lookup, digest_store=None):
     hasher = blake2b()
     for build_pipeline in filepack.get_build_pipelines():
         for build_step in build_pipeline:
@@ -11,8 +11,11 @@ def hashFilepack(mm_root, filepack, softcode_lookup):
                 continue
             hasher.update(build_step.src.encode(default_encoding))
             hasher.update(build_step.rule.encode(default_encoding))
-            edit_time = os.path.getmtime(filepath)
-            hasher.update(str(edit_time).encode(default_encoding))
+            if digest_store is None:
+                edit_time = os.path.getmtime(filepath)
+                hasher.update(str(edit_time).encode(default_encoding))
+            else:
+                hasher.update(digest_store.get_digest(filepath).encode(default_encoding))
             if build_step.rule_args is not None:
                 for arg in build_step.rule_args:
                     hasher.update(arg.encode(default_encoding))
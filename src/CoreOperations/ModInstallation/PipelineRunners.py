@@ -1,23 +1,48 @@
-import json
+from concurrent.futures import ProcessPoolExecutor
 import os
 import sys
 
 from PyQt5 import QtCore
 
-from src.CoreOperations.PluginLoaders.FilePacksPluginLoader import get_filepack_plugins_dict
+from src.CoreOperations.ModBuildGraph.ContentCache import store_blob
 from src.CoreOperations.PluginLoaders.PatchersPluginLoader import get_patcher_plugins_dict
 from src.Utils.Signals import StandardRunnableSignals
-from src.Utils.JSONHandler import JSONHandler
+from src.Utils.CacheIndex import CacheIndex
+from src.Utils.TableCache import add_table_digests, take_new_table_digests
 
 translate = QtCore.QCoreApplication.translate
 
 patchers = get_patcher_plugins_dict()
 
 
+def run_patcher(filepack, paths, path_prefix, softcodes, archive_postaction):
+    patcher = patchers[filepack.filepack](filepack, paths, path_prefix, softcodes, post_action=archive_postaction)
+    patcher.execute()
+    return {pack_target: filepack.hash for pack_target in filepack.get_pack_targets()}
+
+
+#############################
+# PROCESS-POOL PATCHER JOBS #
+#############################
+# The softcode lookup is shared by every job, so it is sent to each worker
+# process once when the pool starts rather than being pickled per filepack
+process_softcodes = None
+
+def init_patcher_process(softcodes):
+    global process_softcodes
+    process_softcodes = softcodes
+
+def run_patcher_in_process(filepack, paths, path_prefix, archive_postaction):
+    cache_updates = run_patcher(filepack, paths, path_prefix, process_softcodes, archive_postaction)
+    # The installer saves the table digests once the install is done, so
+    # workers never write to the digest store themselves
+    return cache_updates, take_new_table_digests()
+
+
 class PipelineRunner(QtCore.QRunnable):
-    __slots__ = ("softcodes", "target", "filepack", "path_prefix", "paths", "cache_index", "archive_postaction", "signals")
+    __slots__ = ("softcodes", "target", "filepack", "path_prefix", "paths", "cache_index", "archive_postaction", "process_pool", "signals")
     
-    def __init__(self, target, filepack, path_prefix, paths, cache_index, softcodes, archive_postaction):
+    def __init__(self, target, filepack, path_prefix, paths, cache_index, softcodes, archive_postaction, process_pool=None):
         super().__init__()
         self.target = target
         self.filepack = filepack
@@ -26,23 +51,41 @@ class PipelineRunner(QtCore.QRunnable):
         self.cache_index = cache_index
         self.softcodes = softcodes
         self.archive_postaction = archive_postaction
+        self.process_pool = process_pool
         
         self.signals = StandardRunnableSignals()
         
     def run(self):
         try:
             self.signals.started.emit(self.target)
-            patcher = patchers[self.filepack.filepack](self.filepack, self.paths, self.path_prefix, self.softcodes, post_action=self.archive_postaction)
-            patcher.execute()
-            for pack_target in self.filepack.get_pack_targets():
-                self.cache_index[pack_target] = self.filepack.hash
+            if self.process_pool is None:
+                cache_updates = run_patcher(self.filepack, self.paths, self.path_prefix, self.softcodes, self.archive_postaction)
+            else:
+                # Only the pack hashes and table digests come back, so the
+                # thread just waits
+                cache_updates, table_digests = self.process_pool.submit(run_patcher_in_process, self.filepack, self.paths, self.path_prefix, self.archive_postaction).result()
+                add_table_digests(table_digests)
+            for pack_target, hashval in cache_updates.items():
+                self.cache_index[pack_target] = hashval
+                archive_pack_target = os.path.join(self.path_prefix, pack_target)
+                cached_file = os.path.join(self.paths.patch_cache_loc, archive_pack_target)
+                if os.path.isfile(cached_file):
+                    store_blob(self.paths.patch_blob_loc, hashval, archive_pack_target, cached_file)
             self.signals.finished.emit()
         except Exception as e:
             self.signals.raise_exception.emit(e)
 
 
-class PipelineCollection(QtCore.QObject):
-    __slots__ = ("softcodes", "threadpool", "path_prefix", "archive_postaction", "paths", "build_pipelines", "message", "cache_index")
+class PipelineScheduler(QtCore.QObject):
+    """
+    Submits every filepack across all archives and groups to the threadpool
+    at once. Two filepacks are only run one after another if they share a
+    resource target, since patchers unpack those into the (un-prefixed)
+    build directory; the filepack listed first is always run first.
+    """
+    __slots__ = ("threadpool", "ops", "archives", "softcodes", "waiting", "busy_targets", 
+                 "archive_cache_indices", "archive_job_counts", "n_jobs", "completed_jobs", "curJob",
+                 "pre_message", "message", "timer", "aborted", "process_pool")
     
     finished = QtCore.pyqtSignal()
     exiting = QtCore.pyqtSignal()
@@ -50,20 +93,23 @@ class PipelineCollection(QtCore.QObject):
     updateLog = QtCore.pyqtSignal(str)
     raise_exception = QtCore.pyqtSignal(Exception)
     
-    def __init__(self, threadpool, path_prefix, archive_postaction, paths, build_pipelines, message, cache_index, softcodes, parent=None):
+    def __init__(self, threadpool, ops, archives, softcodes, message, parent=None):
         super().__init__(parent)
-        self.softcodes = softcodes
         self.threadpool = threadpool
-        self.path_prefix = path_prefix
-        self.archive_postaction = archive_postaction
-        self.paths = paths
-        self.build_pipelines = build_pipelines
+        self.ops = ops
+        self.archives = archives
+        self.softcodes = softcodes
         self.message = message
-        self.cache_index = cache_index
-        self.curJob = ""
         self.pre_message = ""
+        self.curJob = ""
+        self.aborted = False
+        self.process_pool = None
         
-        self.n_jobs = len(build_pipelines)
+        self.waiting = []
+        self.busy_targets = set()
+        self.archive_cache_indices = {}
+        self.archive_job_counts = {}
+        self.n_jobs = 0
         self.completed_jobs = 0
         
         self.finished.connect(self.exiting)
@@ -72,9 +118,10 @@ class PipelineCollection(QtCore.QObject):
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.logCurrentJob)
         self.exiting.connect(self.timer.stop)
+        self.exiting.connect(self.shutdownProcessPool)
         
-    def setLogInfo(self, curStep, maxSteps, depth):
-        self.pre_message = ">>"*depth + " " + translate("Common", "[Step {curStep}/{maxSteps}] ").format(curStep=curStep, maxSteps=maxSteps)
+    def setLogInfo(self, pre_message):
+        self.pre_message = pre_message
         
     @QtCore.pyqtSlot(str)
     def jobStarted(self, msg):
@@ -82,103 +129,100 @@ class PipelineCollection(QtCore.QObject):
         
     @QtCore.pyqtSlot()
     def logCurrentJob(self):
-        self.updateLog.emit(translate("ModInstall","{current_step_message}{main_message}... ").format(current_step_message=self.pre_message,main_message=self.message)+ f"[{self.completed_jobs+1}/{self.n_jobs}] [{self.curJob}]")
-        
-    @QtCore.pyqtSlot()
-    def checkIfCompleted(self):
-        self.completed_jobs += 1
-        if self.completed_jobs == self.n_jobs:
-            self.updateLog.emit(translate("ModInstall","{current_step_message}{main_message}... Done. ").format(current_step_message=self.pre_message,main_message=self.message)+ f"[{self.completed_jobs}/{self.n_jobs}]")
-            self.finished.emit()
+        self.updateLog.emit(translate("ModInstall", "{current_step_message} {main_message}... ").format(current_step_message=self.pre_message, main_message=self.message) + f"[{self.completed_jobs+1}/{self.n_jobs}] [{self.curJob}]")
         
     @QtCore.pyqtSlot(Exception)
     def handleException(self, e):
+        if self.aborted:
+            return
+        self.aborted = True
         self.threadpool.clear()
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
         self.threadpool.waitForDone()
         self.raise_exception.emit(e)
         
     @QtCore.pyqtSlot()
-    def execute(self):
+    def shutdownProcessPool(self):
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+            self.process_pool = None
+        
+    def make_job(self, archive, filepack_target, filepack):
+        prefix = sys.intern(archive.get_prefix())
+        job = PipelineRunner(os.path.join(prefix, filepack_target), filepack, prefix, self.ops.paths, self.archive_cache_indices[archive.archive_name], self.softcodes, archive.filepack_build_postaction, self.process_pool)
+        job.signals.started.connect(self.jobStarted)
+        job.signals.raise_exception.connect(self.handleException)
+        job.signals.finished.connect(lambda : self.jobCompleted(archive, filepack))
+        job.setAutoDelete(True)
+        return job
+    
+    @staticmethod
+    def get_build_dir_targets(filepack):
+        return {os.path.normpath(target) for target in filepack.get_resource_targets()}
+        
+    def submit_ready_jobs(self):
+        still_waiting = []
+        # Anything that has to wait for a target also blocks any jobs later 
+        # in the queue that want it, so that the original ordering is kept
+        claimed_targets = set(self.busy_targets)
+        for archive, filepack_target, filepack in self.waiting:
+            targets = self.get_build_dir_targets(filepack)
+            if targets.isdisjoint(claimed_targets):
+                self.busy_targets.update(targets)
+                self.threadpool.start(self.make_job(archive, filepack_target, filepack))
+            else:
+                still_waiting.append((archive, filepack_target, filepack))
+            claimed_targets.update(targets)
+        self.waiting = still_waiting
+        
+    def jobCompleted(self, archive, filepack):
+        if self.aborted:
+            return
         try:
-            self.log.emit(translate("ModInstall::Debug", "---pipeline build log message---"))
-            self.timer.start(100)
-            for filepack_target, filepack in self.build_pipelines.items():
-                job = PipelineRunner(filepack_target, filepack, self.path_prefix, self.paths, self.cache_index, self.softcodes, self.archive_postaction)
+            self.completed_jobs += 1
+            self.busy_targets.difference_update(self.get_build_dir_targets(filepack))
+            
+            self.archive_job_counts[archive.archive_name] -= 1
+            if self.archive_job_counts[archive.archive_name] == 0:
+                self.finalise_archive(archive)
                 
-                job.signals.started.connect(self.jobStarted)
-                job.signals.raise_exception.connect(self.handleException)
-                job.signals.finished.connect(self.checkIfCompleted)
-                job.setAutoDelete(True)
-                self.threadpool.start(job)
+            if self.completed_jobs == self.n_jobs:
+                self.updateLog.emit(translate("ModInstall", "{current_step_message} {main_message}... Done. ").format(current_step_message=self.pre_message, main_message=self.message) + f"[{self.completed_jobs}/{self.n_jobs}]")
+                self.finished.emit()
+            else:
+                self.submit_ready_jobs()
         except Exception as e:
             self.handleException(e)
-
-
-class ArchivePipelineCollection(QtCore.QObject):
-    __slots__ = ("archive", "ops", "ui", "softcodes", "threadpool", "pre_message", "cache_index")
-    
-    finished = QtCore.pyqtSignal()
-    log = QtCore.pyqtSignal(str)
-    updateLog = QtCore.pyqtSignal(str)
-    raise_exception = QtCore.pyqtSignal(Exception)
-    
-    def __init__(self, threadpool, ops, ui, archive, softcodes, parent=None):
-        super().__init__(parent)
-        self.archive = archive
-        self.ops = ops
-        self.ui = ui
-        self.softcodes = softcodes
-        self.threadpool = threadpool
-        self.cache_index = None
-        self.pre_message = ""
-    
-    def setLogInfo(self, curStep, maxSteps, depth):
-        self.pre_message = ">>"*depth + " " + translate("ModInstall", "[Step {curStep}/{maxSteps}] ").format(curStep=curStep, maxSteps=maxSteps)
+            
+    def finalise_archive(self, archive):
+        prefix = archive.get_prefix()
+        cache_index = self.archive_cache_indices[archive.archive_name]
+        with CacheIndex(self.ops.paths.patch_cache_index_loc, self.ops.paths.legacy_cache_index_loc) as total_cache:
+            total_cache.update((os.path.join(prefix, file), hashval) for file, hashval in cache_index.items())
     
     @QtCore.pyqtSlot()
     def execute(self):
         try:
-            self.log.emit(translate("ModInstall", "{current_step_message}Building {archive_name} files...").format(current_step_message=self.pre_message, archive_name=self.archive.archive_name))
-            self.cache_index = {}
-            filepack_lookup = get_filepack_plugins_dict()
+            for archive in self.archives:
+                self.archive_cache_indices[archive.archive_name] = {}
+                self.archive_job_counts[archive.archive_name] = 0
+                # Groups are kept in plugin priority order, so that any
+                # conflicting filepacks are built in the same order as before
+                for group, group_build_pipelines in archive.build_graph.items():
+                    for filepack_target, filepack in group_build_pipelines.items():
+                        self.waiting.append((archive, filepack_target, filepack))
+                        self.archive_job_counts[archive.archive_name] += 1
+            self.n_jobs = len(self.waiting)
             
-            graph = self.archive.build_graph
+            if not self.n_jobs:
+                self.finished.emit()
+                return
             
-            group_pipes = []
-            for group in list(graph.keys()):
-                group_build_pipelines = graph[group]
-                if not len(group_build_pipelines):
-                    continue
-                filepack = filepack_lookup[group]
-                pcol = PipelineCollection(self.threadpool, sys.intern(self.archive.get_prefix()), self.archive.filepack_build_postaction, self.ops.paths, group_build_pipelines, filepack.get_build_message(), self.cache_index, self.softcodes, parent=self)
-                pcol.log.connect(self.log)
-                pcol.updateLog.connect(self.updateLog)
-                pcol.raise_exception.connect(self.raise_exception.emit)
-                group_pipes.append(pcol)
-                
-            n_gpipes = len(group_pipes)
-            # Link the builders up to each other
-            for i, (group_pipe, next_group_pipe) in enumerate(zip(group_pipes[:-1], group_pipes[1:])):
-                def make_link(actor):
-                    return lambda : actor.execute()
-                group_pipe.finished.connect(make_link(next_group_pipe))
-                group_pipe.raise_exception.connect(self.raise_exception)
-                group_pipe.setLogInfo(i+1, n_gpipes, 2)
-            group_pipes[-1].finished.connect(self.finalise_build)
-            group_pipes[-1].raise_exception.connect(self.raise_exception)
-            group_pipes[-1].setLogInfo(n_gpipes, n_gpipes, 2)
+            if self.ops.config_manager.get_multiprocess_pref():
+                self.process_pool = ProcessPoolExecutor(initializer=init_patcher_process, initargs=(self.softcodes,))
             
-            # Start the pool; will signal this object when done
-            group_pipes[0].execute()
+            self.timer.start(100)
+            self.submit_ready_jobs()
         except Exception as e:
-            self.raise_exception.emit(e)
-            
-    def finalise_build(self):
-        with JSONHandler(self.ops.paths.patch_cache_index_loc, f"Error reading '{self.ops.paths.patch_cache_index_loc}'") as stream:
-            total_cache = stream
-        for file, hashval in self.cache_index.items():
-            total_cache[os.path.join(self.archive.get_prefix(), file)] = hashval
-        with open(self.ops.paths.patch_cache_index_loc, 'w') as F:
-            json.dump(total_cache, F, indent=2)
-
-        self.finished.emit()
+            self.handleException(e)
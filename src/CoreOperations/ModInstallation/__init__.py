@@ -6,11 +6,18 @@ from PyQt5 import QtCore
 
 from src.CoreOperations.ModBuildGraph import ModBuildGraphCreator
 from src.CoreOperations.ModBuildGraph.graphHash import hashFilepack
-from src.CoreOperations.ModInstallation.PipelineRunners import ArchivePipelineCollection
+from src.CoreOperations.ModBuildGraph.ContentCache import get_blob_path, prune_blobs, restore_blob
+from src.CoreOperations.ModInstallation.PipelineRunners import PipelineScheduler
 from src.CoreOperations.ModInstallation.VariableParser import parse_mod_variables, scan_variables_for_softcodes
 from src.CoreOperations.PluginLoaders.FilePacksPluginLoader import get_filepack_plugins_dict
-from src.Utils.JSONHandler import JSONHandler
-from src.Utils.MBE import mbetable_to_dict, dict_to_mbetable
+from src.Utils.CacheIndex import CacheIndex
+from src.Utils.Digests import DigestStore
+from src.Utils.Filelist import get_filelist_index
+from src.Utils.InstalledState import InstalledState, digest_install_inputs
+from src.Utils.MBE import mbetable_to_dict, dict_to_mbetable, read_mbetable_rows
+from src.Utils.MDB1 import MDB1ArchiveReader, get_mdb1_toc_cache
+from src.Utils.TableCache import get_table_cache, save_table_caches
+from src.Utils.Verification import record_snapshots
 from libs.dscstools import DSCSTools
 
 translate = QtCore.QCoreApplication.translate
@@ -145,66 +152,68 @@ class BuildGraphRunner(QtCore.QObject):
     def process_graph(self, build_graphs, softcode_lookup):
         self.sendLog(translate("ModInstall", "Looking for cached mod files..."))
         
-        # Create the cache index if it doesn't exist
-        if not os.path.exists(self.ops.paths.patch_cache_index_loc):
-            with open(self.ops.paths.patch_cache_index_loc, 'w') as F:
-                F.write("{}")
-                
         # Create the cache folder if it doesn't exist
         os.makedirs(self.ops.paths.patch_cache_loc, exist_ok=True)
-        with JSONHandler(self.ops.paths.patch_cache_index_loc, f"Error reading '{self.ops.paths.patch_cache_index_loc}") as stream:
-            cache_index = stream
+        # Source files are hashed by content rather than edit time, so that
+        # touching or re-registering a mod doesn't invalidate its packs
+        digest_store = DigestStore(self.ops.paths.source_digests_loc)
             
         # Now prepare the process the build graph
         # Init some variables to count the number of packs in the build graph,
         # and the count how many are found in the cache
         n_found = 0
         n_total = 0
-        # First just loop over the archive categories and archives...
-        for archive_type, archives in list(build_graphs.items()):
-            for archive, archive_obj in list(archives.items()):
-                # Now we can actually inspect the filepacks we want to install...
-                build_pipelines = archive_obj.build_graph
-                for pack_type, packs in list(build_pipelines.items()):
-                    ######################################
-                    # Process each pack's build pipeline #
-                    ######################################
+        with CacheIndex(self.ops.paths.patch_cache_index_loc, self.ops.paths.legacy_cache_index_loc) as cache_index:
+            # First just loop over the archive categories and archives...
+            for archive_type, archives in list(build_graphs.items()):
+                for archive, archive_obj in list(archives.items()):
+                    # Now we can actually inspect the filepacks we want to install...
+                    build_pipelines = archive_obj.build_graph
+                    for pack_type, packs in list(build_pipelines.items()):
+                        ######################################
+                        # Process each pack's build pipeline #
+                        ######################################
                     
-                    # 1. Start by iterating over each pack in each pack category
-                    for pack_name, pack in list(packs.items()):
-                        ###########################################
-                        # Bake the softcode values into the packs #
-                        ###########################################
-                        # 1. This replaces filenames and data softcodes with values
-                        pack.bake_softcodes(softcode_lookup)
+                        # 1. Start by iterating over each pack in each pack category
+                        for pack_name, pack in list(packs.items()):
+                            ###########################################
+                            # Bake the softcode values into the packs #
+                            ###########################################
+                            # 1. This replaces filenames and data softcodes with values
+                            pack.bake_softcodes(softcode_lookup)
                         
-                        #################################
-                        # Check is pack is in the cache #
-                        #################################
-                        # 1. Make a hash of the filepack
-                        pack.hash = hashFilepack(self.ops.paths.mm_root, pack, softcode_lookup)
-                        pack_is_in_cache = True
-                        pack_targets = pack.get_pack_targets()
-                        n_total += len(pack_targets)
+                            #################################
+                            # Check is pack is in the cache #
+                            #################################
+                            # 1. Make a hash of the filepack
+                            pack.hash = hashFilepack(self.ops.paths.mm_root, pack, softcode_lookup, digest_store)
+                            pack_is_in_cache = True
+                            pack_targets = pack.get_pack_targets()
+                            n_total += len(pack_targets)
                         
-                        # 2. Check if each source file of the filepack is
-                        # in the cache
-                        for pack_target in pack_targets:
-                            archive_pack_target = os.path.join(archive_obj.get_prefix(), pack_target)
-                            if cache_index.get(archive_pack_target) != pack.hash or not os.path.isfile(os.path.join(self.ops.paths.patch_cache_loc, archive_pack_target)):
-                                pack_is_in_cache = False
-                                break
-                            n_found += 1
-                            
-                        # 3. Cull the pack if all pack targets are in the cache
-                        if pack_is_in_cache:
+                            # 2. Check if each source file of the filepack is
+                            # in the cache, falling back to the blob store if
+                            # the pack was built before under another profile
                             for pack_target in pack_targets:
-                                archive_obj.cached_pack_targets.append(pack_target)
-                            del packs[pack_name]
+                                archive_pack_target = os.path.join(archive_obj.get_prefix(), pack_target)
+                                cached_file = os.path.join(self.ops.paths.patch_cache_loc, archive_pack_target)
+                                if cache_index.get(archive_pack_target) != pack.hash or not os.path.isfile(cached_file):
+                                    if not restore_blob(self.ops.paths.patch_blob_loc, pack.hash, archive_pack_target, cached_file):
+                                        pack_is_in_cache = False
+                                        break
+                                    cache_index[archive_pack_target] = pack.hash
+                                n_found += 1
+                            
+                            # 3. Cull the pack if all pack targets are in the cache
+                            if pack_is_in_cache:
+                                for pack_target in pack_targets:
+                                    archive_obj.cached_pack_targets.append(pack_target)
+                                del packs[pack_name]
                             
-                    # 2. Cull any groups with no packs
-                    if not len(build_pipelines[pack_type]):
-                        del build_pipelines[pack_type]
+                        # 2. Cull any groups with no packs
+                        if not len(build_pipelines[pack_type]):
+                            del build_pipelines[pack_type]
+        digest_store.save()
         self.sendUpdateLog(translate("ModInstall", "Looking for cached mod files... found {ratio} in cache.").format(ratio=f"[{n_found}/{n_total}]"))
        
        
@@ -250,8 +259,7 @@ class ResourceBootstrapper(QtCore.QObject):
         try:
             self.log.emit(translate("ModInstall", "{curr_step_msg} Checking required resources...").format(curr_step_msg=self.pre_message))
             
-            with JSONHandler(os.path.join(self.ops.paths.config_loc, "filelist.json"), "Error reading 'filelist.json'") as stream:
-                resource_archives = stream
+            resource_archives = get_filelist_index(self.ops.paths.config_loc)
             
             required_resources = {}
             for archive_type, archives in self.build_graphs.items():
@@ -318,7 +326,7 @@ class BuildGraphExecutor(QtCore.QObject):
         self.ops = ops
         self.build_graphs = None
         self.softcodes = None
-        self.cache_index = None
+        self.scheduler = None
         self.pre_message = None
         self.finished.connect(self.clean_up.emit)
         self.raise_exception.connect(self.clean_up.emit)
@@ -339,33 +347,24 @@ class BuildGraphExecutor(QtCore.QObject):
         try:
             self.ui.log(translate("ModInstall", "{curr_step_message} Creating modded assets...").format(curr_step_message=self.pre_message))
 
-            archive_pipes = []
+            archives_to_build = []
             for archive_type, archives in self.build_graphs.items():
                 for archive_name, archive in archives.items():
                     # Make the cache location
                     os.makedirs(os.path.join(self.ops.paths.patch_cache_loc, archive_name), exist_ok=True)
                     if not len(archive.build_graph):
                         continue
-                    # Softcodes get baked in here!
-                    apcol = ArchivePipelineCollection(self.threadpool, self.ops, self.ui, archive, self.softcodes, parent=self)
-                    apcol.log.connect(self.ui.log)
-                    apcol.updateLog.connect(self.ui.updateLog)
-                    apcol.raise_exception.connect(self.raise_exception)
-                    archive_pipes.append(apcol)
+                    archives_to_build.append(archive)
                     
-            n_pipes = len(archive_pipes)
-            # Link the archive builders up to each other
-            for i, (archive_pipe, next_archive_pipe) in enumerate(zip(archive_pipes, archive_pipes[1:])):
-                def make_link(actor):
-                    return lambda : actor.execute()
-                archive_pipe.setLogInfo(i+1, n_pipes, 1)
-                archive_pipe.finished.connect(make_link(next_archive_pipe))
-                
-            # Finalise and execute
-            if len(archive_pipes):
-                archive_pipes[-1].setLogInfo(n_pipes, n_pipes, 1)
-                archive_pipes[-1].finished.connect(self.finished.emit)
-                archive_pipes[0].execute()
+            if len(archives_to_build):
+                # Softcodes get baked in here!
+                self.scheduler = PipelineScheduler(self.threadpool, self.ops, archives_to_build, self.softcodes, translate("ModInstall", "Creating modded assets"), parent=self)
+                self.scheduler.setLogInfo(self.pre_message)
+                self.scheduler.log.connect(self.ui.log)
+                self.scheduler.updateLog.connect(self.ui.updateLog)
+                self.scheduler.raise_exception.connect(self.raise_exception)
+                self.scheduler.finished.connect(self.finished.emit)
+                self.scheduler.execute()
             else:
                 self.ui.updateLog(translate("ModInstall", "{curr_step_message} Creating modded assets... no files to build.").format(curr_step_message=self.pre_message))
                 self.finished.emit()
@@ -415,7 +414,7 @@ class DataSorter(QtCore.QObject):
             cache_loc = self.ops.paths.patch_cache_loc
             if os.path.exists(cache_table := os.path.join(cache_loc, "DSDBP", "data", "digimon_common_para.mbe")): 
                 # Get the required data
-                hdr, build_common_para_digimon = self.get_resource_table("DSDBP", ["data", "digimon_common_para.mbe"], "digimon.csv")
+                hdr, build_common_para_digimon = self.get_resource_table("DSDBP", ["data", "digimon_common_para.mbe"], "digimon.csv", writeback=True)
                 _, build_charname = self.get_resource_table("DSDB", ["text", "charname.mbe"], "Sheet1.csv")
 
                 # Now do the sorting
@@ -449,28 +448,50 @@ class DataSorter(QtCore.QObject):
         except Exception as e:
             self.raise_exception.emit(e)
             
-    def get_resource_table(self, archive, table_path, subtable):
+    def get_resource_table(self, archive, table_path, subtable, writeback=False):
+        """
+        If writeback is set, the whole MBE is unpacked into the build
+        directory so that the caller can patch the table and repack it.
+        Otherwise the table is only read, and is served from the table cache.
+        """
         mbe_filepack = get_filepack_plugins_dict()["MBE"]
             
         cache_loc = self.ops.paths.patch_cache_loc
         build_loc = self.ops.paths.patch_build_loc
         resource_loc = self.ops.paths.base_resources_loc
-        working_loc = os.path.join(build_loc, "working")
-        os.makedirs(working_loc, exist_ok=True)
-        
             
         build_file = os.path.join(build_loc, *table_path)
-        if os.path.exists(cached_file := os.path.join(cache_loc, "DSDBP", *table_path)):
+        build_subtable = os.path.join(build_file, subtable)
+        cached_file = os.path.join(cache_loc, "DSDBP", *table_path)
+        resource_file = os.path.join(resource_loc, *table_path)
+        
+        def unpack_cached_table():
+            working_loc = os.path.join(build_loc, "working")
+            os.makedirs(working_loc, exist_ok=True)
             DSCSTools.dobozDecompress(cached_file, build_file)
             mbe_filepack.unpack(build_file, working_loc)
-        elif os.path.exists(resource_file := os.path.join(resource_loc, *table_path)):
+            os.rmdir(working_loc)
+            return read_mbetable_rows(build_subtable)
+        
+        if not writeback:
+            table_cache = get_table_cache(self.ops.paths.table_cache_loc)
+            if os.path.exists(cached_file):
+                # Keyed on the packed file, so a hit skips unpacking entirely.
+                # Modded tables change between installs, so are kept in memory
+                return table_cache.get_dict(cached_file, 1, loader=unpack_cached_table, subkey=subtable, persist=False)
+            elif os.path.exists(resource_file):
+                return table_cache.get_dict(os.path.join(resource_file, subtable), 1)
+            
+        if os.path.exists(cached_file):
+            unpack_cached_table()
+        elif os.path.exists(resource_file):
             shutil.copytree(resource_file, build_file)
         else:
-            DSCSTools.extractMDB1File(os.path.join(self.ops.paths.game_resources_loc, f"{archive}.steam.mvgl"), build_loc, "/".join(table_path))
-        
-        os.rmdir(working_loc)
+            archive_path = os.path.join(self.ops.paths.game_resources_loc, f"{archive}.steam.mvgl")
+            toc = get_mdb1_toc_cache(self.ops.paths.mdb1_toc_cache_loc).get_toc(archive_path)
+            with MDB1ArchiveReader(archive_path, toc) as reader:
+                reader.extract_file("/".join(table_path), build_loc)
         
-        build_subtable = os.path.join(build_file, subtable)
         return mbetable_to_dict({}, build_subtable, 1, None, None)
     
     def name_getter(self, id_, charnames, lang):
@@ -507,7 +528,7 @@ class DataSorter(QtCore.QObject):
                 cache_loc = self.ops.paths.patch_cache_loc
                 if os.path.exists(cache_table := os.path.join(cache_loc, "DSDBP", "data", table)): 
                     # Get the required data
-                    hdr, build_voice_data = self.get_resource_table("DSDBP", ["data", table], "voice.csv")
+                    hdr, build_voice_data = self.get_resource_table("DSDBP", ["data", table], "voice.csv", writeback=True)
     
                     build_voice_data = {key: value for key, value in sorted(build_voice_data.items(), key=lambda x: x[0][0])}
 
@@ -537,7 +558,7 @@ class DataSorter(QtCore.QObject):
             cache_loc = self.ops.paths.patch_cache_loc
             if os.path.exists(cache_table := os.path.join(cache_loc, "DSDBP", "data", "item_para.mbe")): 
                 # Get the required data
-                hdr, build_common_para_digimon = self.get_resource_table("DSDBP", ["data", "item_para.mbe"], "table.csv")
+                hdr, build_common_para_digimon = self.get_resource_table("DSDBP", ["data", "item_para.mbe"], "table.csv", writeback=True)
                 _, build_charname = self.get_resource_table("DSDB", ["text", "item_name.mbe"], "Sheet1.csv")
 
                 # Now do the sorting
@@ -587,7 +608,7 @@ class DataSorter(QtCore.QObject):
             cache_loc = self.ops.paths.patch_cache_loc
             if os.path.exists(cache_table := os.path.join(cache_loc, "DSDBP", "data", "digimon_market_para.mbe")): 
                 # Get the required data
-                hdr, build_common_para_digimon = self.get_resource_table("DSDBP", ["data", "digimon_market_para.mbe"], "table.csv")
+                hdr, build_common_para_digimon = self.get_resource_table("DSDBP", ["data", "digimon_market_para.mbe"], "table.csv", writeback=True)
                 _, build_charname = self.get_resource_table("DSDB", ["text", "charname.mbe"], "Sheet1.csv")
 
                 # Now do the sorting
@@ -662,16 +683,51 @@ class ArchiveBuilder(QtCore.QObject):
                 for archive_name, archive in archives.items():
                     n_items += 1
                     
+            # Archives whose inputs match those they were last installed
+            # from would be packed into the files already in the game
+            installed_state = InstalledState(self.ops.paths.installed_state_loc)
+            digest_store = DigestStore(self.ops.paths.source_digests_loc)
             cur_item = 0
             for archive_t, archives in self.build_graphs.items():
                 for archive_name, archive in archives.items():
                     cur_item += 1
                     archive.setLogs(lambda x: self.log.emit(generate_prefixed_message(cur_item, n_items, x)), 
                                     lambda x: self.updateLog.emit(generate_prefixed_message(cur_item, n_items, x)))
+                    archive_key = f"{archive_t}/{archive_name}"
+                    inputs = archive.get_install_inputs()
+                    inputs_digest = None if inputs is None else digest_install_inputs(inputs, digest_store)
+                    output_paths = archive.get_install_outputs()
+                    if inputs_digest is not None and output_paths is not None and installed_state.is_installed(archive_key, inputs_digest, output_paths):
+                        archive.log(translate("ModInstall", "Skipping {archive_name}... unchanged since the last install.").format(archive_name=archive_name))
+                        continue
+                    # Forget the archive until it has been packed, in case
+                    # packing fails partway through
+                    installed_state.discard(archive_key)
+                    installed_state.save()
                     archive.pack()
+                    if inputs_digest is not None and output_paths is not None:
+                        installed_state.set_installed(archive_key, inputs_digest, output_paths)
+                        installed_state.save()
+                    if output_paths is not None:
+                        # Snapshot whatever replaced a backed-up game file,
+                        # so that verification can tell it from corruption
+                        backed_up_paths = [output_path for output_path in output_paths
+                                           if os.path.isfile(output_path) and self.ops.backups_manager.get_backed_up_filepath_if_exists(output_path, self.ops.paths.game_resources_loc, self.ops.paths.backups_loc) != output_path]
+                        if len(backed_up_paths):
+                            record_snapshots(self.ops.paths.backup_snapshots_loc, self.ops.paths.game_resources_loc, backed_up_paths, installed=True)
+            digest_store.save()
+            save_table_caches()
+            self.prune_blobs()
             self.finished.emit()
         except Exception as e:
             self.raise_exception.emit(e)
+
+    def prune_blobs(self):
+        # The packs of the current install are kept whatever their age
+        blob_loc = self.ops.paths.patch_blob_loc
+        with CacheIndex(self.ops.paths.patch_cache_index_loc, self.ops.paths.legacy_cache_index_loc) as cache_index:
+            referenced_blobs = {get_blob_path(blob_loc, hashval, target) for target, hashval in cache_index.items()}
+        prune_blobs(blob_loc, referenced_blobs)
        
 
 class ModInstaller(QtCore.QObject):
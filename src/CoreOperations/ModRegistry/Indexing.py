@@ -1,6 +1,8 @@
 import hashlib
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
 
 from PyQt5 import QtCore
 
@@ -8,6 +10,7 @@ from src.CoreOperations.ModRegistry.Softcoding import search_string_for_softcode
 from src.Utils.Path import splitpath
 from src.CoreOperations.PluginLoaders.FiletypesPluginLoader import get_build_element_plugins_dict
 from src.CoreOperations.ModRegistry.BuildScript import BuildScript
+from src.Utils.Filelist import get_filelist_index
 from src.Utils.JSONHandler import JSONHandler
 
 translate = QtCore.QCoreApplication.translate
@@ -27,29 +30,28 @@ def make_buildgraph_path(filepath):
     return os.path.join(*splitpath(filepath)[4:])
 
 
-def index_mod_contents(modpath, filetypes):
+def index_mod_contents(modpath, filetype_dispatcher):
     last_edit_time = 0
     paths_hash = hashlib.sha256()
     
-    retval = {be.get_identifier(): {} for filetype in filetypes for be in filetype.get_build_elements()}
+    retval = {be.get_identifier(): {} for filetype in filetype_dispatcher.filetypes for be in filetype.get_build_elements()}
 
     for path, directories, files in os.walk(os.path.relpath(modpath)):
         for file in files:
             filepath = os.path.join(path, file)
             truncated_path = make_buildgraph_path(filepath)
             paths_hash.update(filepath.encode("utf8"))
-            for filetype in filetypes:
-                if filetype.checkIfMatch(path, file):
-                    last_edit_time = max([os.path.getmtime(filepath), last_edit_time])
+            # Every walked file is matched, if only by the default filetype
+            filetype = filetype_dispatcher.get_filetype(path, file)
+            last_edit_time = max([os.path.getmtime(filepath), last_edit_time])
+            
+            for be in filetype.get_build_elements():
+                category = be.get_identifier()
+                try:
+                    retval[category][filepath] = be(truncated_path)
                     
-                    for be in filetype.get_build_elements():
-                        category = be.get_identifier()
-                        try:
-                            retval[category][filepath] = be(truncated_path)
-                            
-                        except Exception as e:
-                            raise IndexFileException(e.__str__(), filepath)
-                    break
+                except Exception as e:
+                    raise IndexFileException(e.__str__(), filepath)
                 
     bonus_files = ["METADATA.json", "BUILD.json", "ALIASES.json"]
     for file in bonus_files:
@@ -76,31 +78,63 @@ def find_softcode_alias(match, aliases):
     return match
 
 
-def index_mod_softcodes(modpath, filetypes, mod_contents_index, aliases):
+def scan_bytes_for_softcodes(data):
+    """
+    Returns [match, offset] for every softcode in the data, where the offset
+    points at the opening bracket. Softcodes cannot span lines.
+    """
+    found = []
+    if b'[' not in data:
+        return found
+    line_offset = 0
+    for line in data.split(b'\n'):
+        if b'[' in line:
+            for match in search_bytestring_for_softcodes(line):
+                found.append([match.group(0).decode('utf8'), line_offset + match.start() - 1])
+        line_offset += len(line) + 1
+    return found
+
+
+def get_file_record(filepath, previous_record):
+    """
+    Returns [size, mtime_ns, digest, softcode_matches] for the file, reusing
+    the softcode scan from the previous index if the file is unchanged.
+    """
+    stat = os.stat(filepath)
+    if previous_record is not None and previous_record[0] == stat.st_size and previous_record[1] == stat.st_mtime_ns:
+        return previous_record
+    with open(filepath, 'rb') as F:
+        data = F.read()
+    digest = blake2b(data, digest_size=16).hexdigest()
+    if previous_record is not None and previous_record[2] == digest:
+        return [stat.st_size, stat.st_mtime_ns, digest, previous_record[3]]
+    return [stat.st_size, stat.st_mtime_ns, digest, scan_bytes_for_softcodes(data)]
+
+
+def index_mod_softcodes(modpath, filetypes, mod_contents_index, aliases, previous_file_records=None):
     softcodable_filetypes = sorted(list(set([be.get_identifier() for filetype in filetypes for be in filetype.get_build_elements() if getattr(be, "enable_softcodes", False)])))
+    if previous_file_records is None:
+        previous_file_records = {}
+    
+    files = [file for filetype in softcodable_filetypes for file in mod_contents_index[filetype]]
+    record_keys = [make_buildgraph_path(file) for file in files]
+    # Reading and scanning the files is I/O-bound, so fan it out
+    with ThreadPoolExecutor() as executor:
+        records = list(executor.map(get_file_record, files, (previous_file_records.get(key) for key in record_keys)))
+    
     softcodes = {}
     all_softcodes = set()
-    for filetype in softcodable_filetypes:
-        files = mod_contents_index[filetype]
-        for file in files:
-
-            file_softcodes = {}
-            with open(file, 'rb') as F:
-                line = F.readline()
-                line_offset = 0
-                while line:
-                    for match in search_bytestring_for_softcodes(line):
-                        code_offset = match.start() - 1
-                        match = match.group(0)
-                        match = match.decode('utf8')
-                        register_softcode(file_softcodes, 
-                                          all_softcodes, 
-                                          match, aliases, 
-                                          line_offset + code_offset)
-                    line_offset = F.tell()
-                    line = F.readline()
-            softcodes[file] = file_softcodes
-    return softcodes, all_softcodes
+    file_records = {}
+    for file, record_key, record in zip(files, record_keys, records):
+        file_records[record_key] = record
+        file_softcodes = {}
+        for match, offset in record[3]:
+            register_softcode(file_softcodes, 
+                              all_softcodes, 
+                              match, aliases, 
+                              offset)
+        softcodes[file] = file_softcodes
+    return softcodes, all_softcodes, file_records
 
 
 def get_targets_softcodes(filetargets, aliases):
@@ -124,8 +158,7 @@ def get_targets_softcodes(filetargets, aliases):
 
 def include_autorequests(config_path, contents, archive_lookup):
     request_build_element = get_build_element_plugins_dict()[("request", "request")]
-    with JSONHandler(os.path.join(config_path, "filelist.json"), f"Error reading 'filelist.json'") as stream:
-        filelist = stream
+    filelist = get_filelist_index(config_path)
     out = {}
     
     for filetype in contents:
@@ -162,7 +195,7 @@ def alias_decoder(obj):
         assert 0, "ALIASES.json must be a dict of strings."
 
 
-def build_index(config_path, filepath, filetypes, archive_getter, archive_from_path_getter, targets_getter, rules_getter, filepath_getter):
+def build_index(config_path, filepath, filetype_dispatcher, archive_getter, archive_from_path_getter, targets_getter, rules_getter, filepath_getter, previous_file_records=None):
     alias_path = os.path.join(os.path.split(filepath)[0], "ALIASES.json")
     if os.path.isfile(alias_path):
         try:
@@ -182,8 +215,8 @@ def build_index(config_path, filepath, filetypes, archive_getter, archive_from_p
     else:
         buildscript = None
     
-    contents, last_edit_time, contents_hash = index_mod_contents(filepath, filetypes)
-    contents_softcodes, all_softcodes = index_mod_softcodes(filepath, filetypes, contents, aliases)
+    contents, last_edit_time, contents_hash = index_mod_contents(filepath, filetype_dispatcher)
+    contents_softcodes, all_softcodes, file_records = index_mod_softcodes(filepath, filetype_dispatcher.filetypes, contents, aliases, previous_file_records)
     archives = archive_getter(filepath, contents)
     targets = targets_getter(filepath, contents, archives)
     rules = rules_getter(filepath, contents)
@@ -349,4 +382,4 @@ def build_index(config_path, filepath, filetypes, archive_getter, archive_from_p
 
     softcode_dump = [sys.intern(key) for key in sorted(all_softcodes)]
 
-    return {'data': index, 'softcodes': softcode_dump, "last_edit_time": last_edit_time, "contents_hash": contents_hash}
+    return {'data': index, 'softcodes': softcode_dump, "last_edit_time": last_edit_time, "contents_hash": contents_hash, "file_records": file_records}
@@ -4,14 +4,16 @@ import shutil
 
 from PyQt5 import QtCore, QtGui
 
+from src.CoreOperations.ModBuildGraph.BinaryIndex import write_binary_index
 from src.CoreOperations.ModRegistry.Indexing import build_index
 from src.CoreOperations.ModRegistry.ModFormatVersions import mod_format_versions
-from src.CoreOperations.PluginLoaders.FiletypesPluginLoader import get_filetype_plugins
+from src.CoreOperations.PluginLoaders.FiletypesPluginLoader import get_filetype_dispatcher
 from src.CoreOperations.PluginLoaders.ModFormatsPluginLoader import get_modformat_plugins, LooseMod
 from src.CoreOperations.PluginLoaders.ModInstallersPluginLoader import get_modinstallers_plugins
 from src.Utils.Exceptions import UnrecognisedModFormatError, ModInstallWizardCancelled,\
                                  InstallerWizardParsingError, SpecificInstallerWizardParsingError
 from src.Utils.JSONHandler import JSONHandler
+from src.Utils.Path import take_stat_snapshot
 
 
 translate = QtCore.QCoreApplication.translate
@@ -63,21 +65,39 @@ class ModRegistry:
         self.profile_manager = profile_manager
         self.raise_exception = raise_exception
 
+    def get_previous_file_records(self, modpath):
+        index_path = os.path.join(modpath, "INDEX.json")
+        if not os.path.isfile(index_path):
+            return {}
+        try:
+            with open(index_path, 'r', encoding="utf-8") as F:
+                return json.load(F).get("file_records", {})
+        except Exception:
+            # Everything just gets rescanned
+            return {}
+
     def index_mod(self, modpath):
         mod_format_version = mod_format_versions[get_mod_version(modpath)]
+        # Snapshot before indexing, so that any edits made whilst indexing
+        # are picked up next time
+        stat_snapshot = take_stat_snapshot(os.path.relpath(os.path.join(modpath, "modfiles")))
         index = build_index(self.paths.config_loc,
                             os.path.join(modpath, "modfiles"), 
-                            get_filetype_plugins(), 
+                            get_filetype_dispatcher(), 
                             mod_format_version.get_archives, 
                             mod_format_version.get_archive_from_path, 
                             mod_format_version.get_targets, 
                             mod_format_version.get_rules,
-                            mod_format_version.get_filepath)
+                            mod_format_version.get_filepath,
+                            self.get_previous_file_records(modpath))
+        index["stat_snapshot"] = stat_snapshot
         return index
     
     def save_index(self, modpath, index):
-        with open(os.path.join(modpath, "INDEX.json"), 'w', encoding="utf-8") as F:
+        json_path = os.path.join(modpath, "INDEX.json")
+        with open(json_path, 'w', encoding="utf-8") as F:
             json.dump(index, F, indent=None, separators=(',', ':'))
+        write_binary_index(os.path.join(modpath, "INDEX.bin"), index, json_path)
             
     def register_mod(self, path):
         mod_name = os.path.split(path)[-1]
@@ -33,8 +33,17 @@ class PathManager:
         self.__patch_build_loc         = self.__clean_path(os.path.join(self.__output_loc, "build"))
         self.__patch_cache_loc         = self.__clean_path(os.path.join(self.__output_loc, "cache"))
         self.__softcode_cache_loc      = self.__clean_path(os.path.join(self.__output_loc, "softcode_cache"))
-        self.__patch_cache_index_loc   = self.__clean_path(os.path.join(self.__output_loc, "CACHE_INDEX.json"))
+        self.__patch_cache_index_loc   = self.__clean_path(os.path.join(self.__output_loc, "CACHE_INDEX.db"))
+        self.__legacy_cache_index_loc  = self.__clean_path(os.path.join(self.__output_loc, "CACHE_INDEX.json"))
+        self.__patch_blob_loc          = self.__clean_path(os.path.join(self.__patch_cache_loc, "_blobs"))
+        self.__build_graph_cache_loc   = self.__clean_path(os.path.join(self.__patch_cache_loc, "_build_graphs"))
+        self.__source_digests_loc      = self.__clean_path(os.path.join(self.__output_loc, "SOURCE_DIGESTS.json"))
+        self.__installed_state_loc     = self.__clean_path(os.path.join(self.__output_loc, "INSTALLED_STATE.json"))
+        self.__backup_digests_loc      = self.__clean_path(os.path.join(self.__output_loc, "BACKUP_DIGESTS.json"))
+        self.__backup_snapshots_loc    = self.__clean_path(os.path.join(self.__output_loc, "BACKUP_SNAPSHOTS.pickle"))
         self.__base_resources_loc      = self.__clean_path(os.path.join(self.__resources_loc, "base_resources"))
+        self.__table_cache_loc         = self.__clean_path(os.path.join(self.__resources_loc, "table_cache"))
+        self.__mdb1_toc_cache_loc      = self.__clean_path(os.path.join(self.__resources_loc, "mdb1_toc_cache"))
         
         
         config_manager.init_with_paths(self)
@@ -50,9 +59,6 @@ class PathManager:
         os.makedirs(self.__patch_build_loc, exist_ok=True)
         os.makedirs(self.__patch_cache_loc, exist_ok=True)
         os.makedirs(self.__base_resources_loc, exist_ok=True)
-        if not os.path.exists(self.__patch_cache_index_loc):
-            with open(self.__patch_cache_index_loc, 'w') as F:
-                F.write('{}')
 
     @staticmethod
     def __standard_error_message(msg):
@@ -140,6 +146,34 @@ class PathManager:
     @property
     def patch_cache_index_loc(self):
         return self.__safe_path_return(self.__patch_cache_index_loc, self.mm_root)
+    
+    @property
+    def legacy_cache_index_loc(self):
+        return self.__safe_path_return(self.__legacy_cache_index_loc, self.mm_root)
+    
+    @property
+    def patch_blob_loc(self):
+        return self.__safe_path_return(self.__patch_blob_loc, self.mm_root)
+    
+    @property
+    def build_graph_cache_loc(self):
+        return self.__safe_path_return(self.__build_graph_cache_loc, self.mm_root)
+    
+    @property
+    def source_digests_loc(self):
+        return self.__safe_path_return(self.__source_digests_loc, self.mm_root)
+    
+    @property
+    def installed_state_loc(self):
+        return self.__safe_path_return(self.__installed_state_loc, self.mm_root)
+    
+    @property
+    def backup_digests_loc(self):
+        return self.__safe_path_return(self.__backup_digests_loc, self.mm_root)
+    
+    @property
+    def backup_snapshots_loc(self):
+        return self.__safe_path_return(self.__backup_snapshots_loc, self.mm_root)
         
     @property
     def profiles_loc(self):
@@ -161,6 +195,14 @@ class PathManager:
     def base_resources_loc(self):
         return self.__safe_path_return(self.__base_resources_loc, self.mm_root)
     
+    @property
+    def table_cache_loc(self):
+        return self.__safe_path_return(self.__table_cache_loc, self.mm_root)
+    
+    @property
+    def mdb1_toc_cache_loc(self):
+        return self.__safe_path_return(self.__mdb1_toc_cache_loc, self.mm_root)
+    
     @property
     def game_loc(self):
         assert os.path.isdir(self.__game_loc), self.__standard_error_message(self.__game_loc)
@@ -201,6 +243,10 @@ class PathManager:
     def index_file_name(self):
         return "INDEX.json"
     
+    @property
+    def binary_index_file_name(self):
+        return "INDEX.bin"
+    
     def compute_game_paths(self):
         self.__game_resources_loc    = self.__clean_path(os.path.join(self.__game_loc, "resources"))
         self.__game_plugins_loc      = self.__clean_path(os.path.join(self.__game_resources_loc, "plugins"))
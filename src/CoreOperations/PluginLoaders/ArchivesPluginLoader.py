@@ -1,21 +1,21 @@
 import inspect
 import os
-import shutil
 
 from PyQt5 import QtCore
 
-from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in
+from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in, plugin_registry
+from src.Utils.FileLinks import clone_file
 
 translate = QtCore.QCoreApplication.translate
 
 def get_archivetype_plugins():
     plugin_dir = os.path.join('plugins', 'archives')
     
-    return [patcher for patcher in [*load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseArchiveType) if inspect.isclass(x) else False), LooseFiles]]
+    return plugin_registry.get_view("archivetypes", lambda: [patcher for patcher in [*load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseArchiveType) if inspect.isclass(x) else False), LooseFiles]])
 
 
 def get_archivetype_plugins_dict():
-    return {archive_t.group: archive_t for archive_t in get_archivetype_plugins()}
+    return plugin_registry.get_view("archivetypes_dict", lambda: {archive_t.group: archive_t for archive_t in get_archivetype_plugins()})
 
 
 class BaseArchiveType:
@@ -34,6 +34,26 @@ class BaseArchiveType:
     
     def pack(self, build_dir, cache_dir, dst):
         raise NotImplementedError()
+    
+    def get_pack_targets(self):
+        pack_targets = list(self.cached_pack_targets)
+        for packtype, packtype_data in self.build_graph.items():
+            for pack_name, pack in packtype_data.items():
+                pack_targets.extend(pack.get_pack_targets())
+        return pack_targets
+    
+    def get_install_inputs(self):
+        """
+        Returns (name, filepath) for every file the packed output is built
+        from, or None if packing should never be skipped.
+        """
+        return None
+    
+    def get_install_outputs(self):
+        """
+        Returns the filepath of every file that packing writes into the game.
+        """
+        return None
         
     def setLogs(self, log, updateLog):
         self.log = log
@@ -61,27 +81,26 @@ class LooseFiles(BaseArchiveType):
         pass
     
     
+    def get_install_inputs(self):
+        return [(pack_target, os.path.join(self.paths.patch_cache_loc, pack_target)) for pack_target in self.get_pack_targets()]
+    
+    def get_install_outputs(self):
+        return [os.path.join(self.paths.game_resources_loc, pack_target) for pack_target in self.get_pack_targets()]
+    
     def __copy_pack_target(self, pack_target):
         cache_dir = self.paths.patch_cache_loc
         backup_dir = self.paths.backups_loc
         dst = os.path.join(self.paths.game_resources_loc, pack_target)
         file_target = os.path.join(cache_dir, pack_target)
         # Make backup if it's needed
-        if pack_target in self.backups.default_misc_files:
-            backup_target = os.path.join(backup_dir, pack_target)
-            os.makedirs(os.path.split(backup_target)[0], exist_ok=True)
-            shutil.copy2(dst, backup_target)
-        os.makedirs(os.path.split(dst)[0], exist_ok=True)
-        shutil.copy2(file_target, dst)
+        if pack_target in self.backups.default_misc_files and os.path.exists(dst):
+            self.backups.try_back_up_file(dst, self.paths.game_resources_loc, backup_dir, self.paths.backup_snapshots_loc)
+        clone_file(file_target, dst)
     
     def pack(self):
         """
         REPLACE COPIES WITH OS.LINK IF IT WORKS OK
         """
         self.log(translate("ArchiveTypes::LooseFiles", "Copying loose files..."))
-        for pack_target in self.cached_pack_targets:
+        for pack_target in self.get_pack_targets():
             self.__copy_pack_target(pack_target)
-        for packtype, packtype_data in self.build_graph.items():
-            for pack_name, pack in packtype_data.items():
-                for pack_target in pack.get_pack_targets():
-                    self.__copy_pack_target(pack_target)
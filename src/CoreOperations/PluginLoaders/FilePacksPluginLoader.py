@@ -4,7 +4,7 @@ import sys
 
 from PyQt5 import QtCore
 
-from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in
+from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in, plugin_registry
 from src.CoreOperations.ModRegistry.Softcoding import search_string_for_softcodes
 from src.Utils.Softcodes import replace_softcodes
 
@@ -12,12 +12,15 @@ translate = QtCore.QCoreApplication.translate
 
 def get_filepack_plugins():
     plugin_dir = os.path.join('plugins', 'filepacks')
-    return [*load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseFilepack) if inspect.isclass(x) else False), UnhandledFilepack]
+    return plugin_registry.get_view("filepacks", lambda: [*load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseFilepack) if inspect.isclass(x) else False), UnhandledFilepack])
 
 def get_filepack_plugins_dict():
-    return {plugin.filepack: plugin for plugin in get_filepack_plugins()}
+    return plugin_registry.get_view("filepacks_dict", lambda: {plugin.filepack: plugin for plugin in get_filepack_plugins()})
 
 def get_filetype_to_filepack_plugins_map():
+    return plugin_registry.get_view("filetype_to_filepack_map", make_filetype_to_filepack_plugins_map)
+
+def make_filetype_to_filepack_plugins_map():
     out = {}
     for plugin in get_filepack_plugins():
         out.update({group: plugin for group in plugin.groups})
@@ -1,24 +1,33 @@
 import inspect
 import os
 
-from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in
+from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in, plugin_registry
 
 
-def get_filetype_plugins():
+def load_filetype_plugins():
     plugin_dir = os.path.join('plugins', 'filetypes')
     
-    return [*load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseFiletype) if inspect.isclass(x) else False), UnhandledFiletype]
+    return load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseFiletype) if inspect.isclass(x) else False)
+
+def get_filetype_plugins():
+    return plugin_registry.get_view("filetypes", lambda: [*load_filetype_plugins(), UnhandledFiletype])
 
 def get_build_element_plugins():
     plugin_dir = os.path.join('plugins', 'filetypes')
     
-    return [*load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseBuildElement) if inspect.isclass(x) else False), UnhandledFiletypeBuildElement]
+    return plugin_registry.get_view("build_elements", lambda: [*load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BaseBuildElement) if inspect.isclass(x) else False), UnhandledFiletypeBuildElement])
 
 def get_targettable_filetypes():
-    return [plugin for plugin in get_filetype_plugins() if hasattr(plugin, "filepack")]
+    return plugin_registry.get_view("targettable_filetypes", lambda: [plugin for plugin in get_filetype_plugins() if hasattr(plugin, "filepack")])
+
+def get_filetype_dispatcher():
+    return plugin_registry.get_view("filetype_dispatcher", lambda: FiletypeDispatcher(load_filetype_plugins(), UnhandledFiletype))
+
+def get_targettable_filetype_dispatcher():
+    return plugin_registry.get_view("targettable_filetype_dispatcher", lambda: FiletypeDispatcher([plugin for plugin in load_filetype_plugins() if hasattr(plugin, "filepack")], UnhandledFiletype))
 
 def get_build_element_plugins_dict():
-    return {plugin.get_identifier(): plugin for plugin in get_build_element_plugins()}
+    return plugin_registry.get_view("build_elements_dict", lambda: {plugin.get_identifier(): plugin for plugin in get_build_element_plugins()})
 
 # def get_type_of_file(path, filename):
 #     for plugin in get_filetype_plugins():
@@ -26,12 +35,59 @@ def get_build_element_plugins_dict():
 #             return plugin
 #     return None
         
+class FiletypeDispatcher:
+    """
+    Finds the filetype of a file by looking up its extension, rather than by
+    asking every filetype in turn. Filetypes that do not declare their
+    extensions are still asked through checkIfMatch, in priority order.
+    Files that match no filetype are given the default filetype.
+    """
+    __slots__ = ("filetypes", "default", "by_extension", "fallbacks")
+    
+    def __init__(self, filetypes, default):
+        self.filetypes = [*filetypes, default]
+        self.default = default
+        
+        extensions = {ext for filetype in filetypes if filetype.extensions is not None for ext in filetype.extensions}
+        self.by_extension = {ext: tuple(filetype for filetype in filetypes if filetype.extensions is None or ext in filetype.extensions) 
+                             for ext in extensions}
+        self.fallbacks = tuple(filetype for filetype in filetypes if filetype.extensions is None)
+        
+    def get_filetype(self, path, filename):
+        candidates = self.by_extension.get(os.path.splitext(filename)[-1], self.fallbacks)
+        if len(candidates):
+            parent_dir = os.path.split(path)[-1]
+            for filetype in candidates:
+                if filetype.extensions is None:
+                    if filetype.checkIfMatch(path, filename):
+                        return filetype
+                elif filetype.checkIfParentDirMatch(parent_dir):
+                    return filetype
+        return self.default
+        
+        
 class BaseFiletype:
     __slots__ = tuple()
     
-    @staticmethod
-    def checkIfMatch(path, filename):
-        raise NotImplementedError()
+    # Filetypes can declare the files they match, which allows them to be
+    # dispatched to by a FiletypeDispatcher without calling checkIfMatch
+    extensions = None          # e.g. (".csv",)
+    parent_dirs = None         # Names the parent directory must have
+    parent_dir_suffixes = None # Suffixes the parent directory must have, e.g. ("mbe",)
+    
+    @classmethod
+    def checkIfMatch(cls, path, filename):
+        if cls.extensions is None:
+            raise NotImplementedError()
+        return os.path.splitext(filename)[-1] in cls.extensions and cls.checkIfParentDirMatch(os.path.split(path)[-1])
+    
+    @classmethod
+    def checkIfParentDirMatch(cls, parent_dir):
+        if cls.parent_dirs is not None and parent_dir not in cls.parent_dirs:
+            return False
+        if cls.parent_dir_suffixes is not None and parent_dir.split('.')[-1] not in cls.parent_dir_suffixes:
+            return False
+        return True
     
     @classmethod
     def get_build_elements(cls):
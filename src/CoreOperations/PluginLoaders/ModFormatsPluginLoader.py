@@ -2,10 +2,10 @@ import inspect
 import os
 
 from src.CoreOperations.ModRegistry.CoreModFormats import LooseMod, ModFile
-from src.CoreOperations.PluginLoaders.PluginLoad import load_plugins_in
+from src.CoreOperations.PluginLoaders.PluginLoad import load_plugins_in, plugin_registry
 
 
 def get_modformat_plugins():
     plugin_dir = os.path.join('plugins', 'modformats')
     
-    return [*load_plugins_in(plugin_dir, lambda x: issubclass(x, ModFile) if inspect.isclass(x) else False), LooseMod]
+    return plugin_registry.get_view("modformats", lambda: [*load_plugins_in(plugin_dir, lambda x: issubclass(x, ModFile) if inspect.isclass(x) else False), LooseMod])
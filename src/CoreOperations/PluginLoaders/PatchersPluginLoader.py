@@ -1,15 +1,15 @@
 import inspect
 import os
 
-from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in
+from src.CoreOperations.PluginLoaders.PluginLoad import load_sorted_plugins_in, plugin_registry
 from plugins.patchers import BasePatcher
 
 
 def get_patcher_plugins():
     plugin_dir = os.path.join('plugins', 'patchers')
     
-    return load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BasePatcher) and type(x) != BasePatcher if inspect.isclass(x) else False)
+    return plugin_registry.get_view("patchers", lambda: load_sorted_plugins_in(plugin_dir, lambda x: issubclass(x, BasePatcher) and type(x) != BasePatcher if inspect.isclass(x) else False))
 
 
 def get_patcher_plugins_dict():
-    return {patcher.group: patcher for patcher in get_patcher_plugins()}
+    return plugin_registry.get_view("patchers_dict", lambda: {patcher.group: patcher for patcher in get_patcher_plugins()})
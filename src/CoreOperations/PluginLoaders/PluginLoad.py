@@ -2,19 +2,64 @@ import importlib
 import inspect
 import os
 import sys
+import threading
 
 from src.Utils.Path import splitpath
 from src.Utils.JSONHandler import JSONHandler
 
 
+class PluginRegistry:
+    """
+    Holds the classes defined in each plugin directory, so that each
+    directory is only listed, imported and inspected once per process.
+    Anything built from the plugins can be cached in the registry as a view.
+    Changes to the plugins only take effect once the program is restarted.
+    """
+    __slots__ = ("plugin_classes", "sort_orders", "views", "lock")
+    
+    def __init__(self):
+        self.plugin_classes = {}
+        self.sort_orders = {}
+        self.views = {}
+        self.lock = threading.RLock()
+        
+    def get_plugin_classes(self, directory):
+        with self.lock:
+            if directory not in self.plugin_classes:
+                self.plugin_classes[directory] = scan_plugins_in(directory)
+            return self.plugin_classes[directory]
+        
+    def get_sort_order(self, directory):
+        with self.lock:
+            if directory not in self.sort_orders:
+                self.sort_orders[directory] = get_plugin_sort_order(directory)
+            return self.sort_orders[directory]
+        
+    def get_view(self, key, factory):
+        """
+        Views are shared between all callers, and so must not be modified.
+        """
+        with self.lock:
+            if key not in self.views:
+                self.views[key] = factory()
+            return self.views[key]
+
+
+plugin_registry = PluginRegistry()
+
+
 def load_sorted_plugins_in(directory, predicate):
     filetype_plugins = load_plugins_in(directory, predicate)
-    plugin_order = get_plugin_sort_order(directory)
+    plugin_order = plugin_registry.get_sort_order(directory)
     
     return sort_plugins(filetype_plugins, plugin_order)
 
 
 def load_plugins_in(directory, predicate):
+    return [cls for cls in plugin_registry.get_plugin_classes(directory) if predicate(cls)]
+
+
+def scan_plugins_in(directory):
     results = []
     for file in os.listdir(directory):
         file, ext = os.path.splitext(file)
@@ -23,8 +68,7 @@ def load_plugins_in(directory, predicate):
         module_name = ".".join([*splitpath(directory), file])
         importlib.import_module(module_name)
         module = sys.modules[module_name]
-        classes_in_module = [m[0] for m in inspect.getmembers(module, predicate) if m[1].__module__ == module.__name__]
-        results.extend([getattr(module, class_) for class_ in classes_in_module])
+        results.extend([m[1] for m in inspect.getmembers(module, inspect.isclass) if m[1].__module__ == module.__name__])
     return results
 
 
@@ -1,10 +1,15 @@
 import inspect
 import os
 
-from src.CoreOperations.PluginLoaders.PluginLoad import load_plugins_in
+from src.CoreOperations.PluginLoaders.PluginLoad import load_plugins_in, plugin_registry
 
 
 def get_rule_plugins(*groups):
+    # Rules hold no state, so the same instances can be shared by everyone
+    return plugin_registry.get_view(("rules", frozenset(groups)), lambda: make_rule_plugins(groups))
+
+
+def make_rule_plugins(groups):
     rule_categories = set(groups)
     plugin_dir = os.path.join('plugins', 'rules')
     rules = load_plugins_in(plugin_dir, inspect.isclass)
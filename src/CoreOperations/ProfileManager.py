@@ -122,6 +122,12 @@ class ProfileManager:
         os.remove(filepath)
         self.profile_selector.removeItem(current_index)
     
+    def get_active_profile_name(self):
+        return self.profile_selector.itemText(self.profile_selector.currentIndex())
+    
+    def get_profile_names(self):
+        return [self.profile_selector.itemText(idx) for idx in range(self.profile_selector.count())]
+    
     def get_active_mods(self):
         activation_states = self.mods_display.get_mod_activation_states()
         return [self.mods[int(idx)] for idx, state in activation_states.items() if state == 2]
@@ -2,6 +2,7 @@ import array
 import json
 import os
 import sys
+from functools import lru_cache
 
 from PyQt5 import QtCore
 
@@ -11,7 +12,7 @@ translate = QtCore.QCoreApplication.translate
 
 
 class SoftcodeCategoryDefinition:
-    __slots__ = ("name", "min", "max", "span", "src", "value_lambda", "methods", "subcategory_defs")
+    __slots__ = ("name", "min", "max", "span", "src", "value_lambda", "methods", "subcategory_defs", "formatting_funcs")
     
     def __init__(self, name, _min, _max, src, value_lambda, methods, subcategory_defs):
         self.name = name
@@ -22,6 +23,7 @@ class SoftcodeCategoryDefinition:
         self.subcategory_defs = subcategory_defs
         self.value_lambda = value_lambda
         self.methods = methods
+        self.formatting_funcs = {}
         
     @classmethod
     def init_from_dict(cls, name, dct):
@@ -39,28 +41,55 @@ class SoftcodeCategoryDefinition:
             out.update(subcat.get_category_sources())
         
     def call_formatting_func(self, func_def_dict, value, parent_value):
+        return self.compile_formatting_func(func_def_dict)(value, parent_value)
+    
+    def get_formatting_func(self, method_name):
+        try:
+            return self.formatting_funcs[method_name]
+        except KeyError:
+            func_def_dict = self.value_lambda if method_name == '' else self.methods[method_name]
+            func = self.compile_formatting_func(func_def_dict)
+            self.formatting_funcs[method_name] = func
+            return func
+    
+    @staticmethod
+    def compile_formatting_func(func_def_dict):
+        n_args = len(func_def_dict)
+        format_string = func_def_dict["return"].format
         # Handle other vars
-        arglist = [None]*(len(func_def_dict))
-        arglist[0] = value
-        for idx, value in func_def_dict.items():
+        arg_handlers = []
+        for idx, arg_type in func_def_dict.items():
             if idx == "return":
                 continue
-            elif value == "parent":
-                arglist[int(idx)] = parent_value
-            elif value == "hex":
-                arglist[int(idx)] = hex(arglist[int(idx)])[2:].lower()
+            elif arg_type in ("parent", "hex"):
+                arg_handlers.append((int(idx), arg_type))
             else:
-                raise Exception(f"Unknown formatting argument \'{value}\'.")
-        return func_def_dict["return"].format(*arglist)
+                raise Exception(f"Unknown formatting argument \'{arg_type}\'.")
+        
+        if not arg_handlers:
+            padding = [None]*(n_args - 1)
+            return lambda value, parent_value: format_string(value, *padding)
+        
+        def formatting_func(value, parent_value):
+            arglist = [None]*n_args
+            arglist[0] = value
+            for idx, arg_type in arg_handlers:
+                if arg_type == "parent":
+                    arglist[idx] = parent_value
+                else:
+                    arglist[idx] = hex(arglist[idx])[2:].lower()
+            return format_string(*arglist)
+        return formatting_func
 
 
 class SoftcodeCategory:
-    __slots__ = ("key_gaps", "definition", "keys")
+    __slots__ = ("key_gaps", "definition", "keys", "dirty")
     
     def __init__(self, definition, data):
         self.key_gaps = array.array('H')
         self.definition = definition
         self.keys = {}
+        self.dirty = False
         self.add_data(data)
         
     def add_data(self, data):
@@ -99,12 +128,34 @@ class SoftcodeCategory:
     def get(self, key_name):
         if key_name not in self.keys:
             self.keys[key_name] = SoftcodeKey(self.generate_next_key(), self.definition.subcategory_defs, {})
+            self.dirty = True
         return self.keys[key_name]
     
+    def is_dirty(self):
+        return self.dirty or any(subcat.is_dirty() for key in self.keys.values() for subcat in key.subcategories.values())
+    
     def get_data_as_serialisable(self):
         return {key_name: key.get_data_as_serialisable() for key_name, key in self.keys.items()}
 
 
+@lru_cache(maxsize=None)
+def parse_softcode_key(softcode_key):
+    """
+    Splits a softcode into a tuple of (category, key, method_name) for each
+    level of the lookup.
+    """
+    path = []
+    remaining_key = softcode_key
+    while True:
+        current_chunk, _, remaining_key = remaining_key.partition(SoftcodeKey.chunk_delimiter)
+        category, _, key = current_chunk.partition(SoftcodeKey.kv_delimiter)
+        key, _, method_name = key.partition(SoftcodeKey.kv_delimiter)
+        # Remove () from method
+        path.append((category, key, method_name[:-2]))
+        if remaining_key == '':
+            return tuple(path)
+
+
 class SoftcodeKey:
     chunk_delimiter = "|"
     kv_delimiter = "::"
@@ -117,29 +168,26 @@ class SoftcodeKey:
                               for subcat in subcategories}
 
         
-    def lookup_softcode(self, softcode_key):
-        current_chunk, _, remaining_key = softcode_key.partition(self.chunk_delimiter)
-        category, _, key = current_chunk.partition(self.kv_delimiter)
-
-        key, _, method_name = key.partition(self.kv_delimiter)
-        
-        # Remove () from method
-        method_name = method_name[:-2]
-
+    def get_subcategory(self, category):
         try:
-            subcat = self.subcategories[category]
+            return self.subcategories[category]
         except KeyError as e:
             raise KeyError(translate("SoftcodeManager", "Softcode Category \"{category_name}\" does not exist.").format(category_name=category)) from e
-        next_softcode = subcat.get(key)
-        if remaining_key == '':
-            if method_name == '':
-                method_data = subcat.definition.value_lambda
-            else:
-                method_data = subcat.definition.methods[method_name]
-                
-            return subcat.definition.call_formatting_func(method_data, next_softcode.value, self.value)
+        
+    def lookup_softcode(self, softcode_key):
+        softcode_key_obj = self
+        path = parse_softcode_key(softcode_key)
+        for category, key, method_name in path:
+            subcat = softcode_key_obj.get_subcategory(category)
+            parent_value = softcode_key_obj.value
+            softcode_key_obj = subcat.get(key)
+        
+        definition = subcat.definition
+        if isinstance(definition, SoftcodeCategoryDefinition):
+            return definition.get_formatting_func(method_name)(softcode_key_obj.value, parent_value)
         else:
-            return next_softcode.lookup_softcode(remaining_key)
+            method_data = definition.value_lambda if method_name == '' else definition.methods[method_name]
+            return definition.call_formatting_func(method_data, softcode_key_obj.value, parent_value)
         
     def get_data_as_serialisable(self):
         res = [self.value]
@@ -149,32 +197,56 @@ class SoftcodeKey:
 
 
 class SoftcodeManager(SoftcodeKey):
-    __slots__ = ("category_defs", "paths")
+    __slots__ = ("category_defs", "category_files", "paths", "resolved_softcodes")
     
     def __init__(self, paths):
         self.paths = paths
         self.category_defs = []
+        self.category_files = {}
+        self.resolved_softcodes = {}
         super().__init__(None, self.category_defs, {})
         
+    def get_subcategory(self, category):
+        # Categories are only read from disk once something looks them up
+        if category not in self.subcategories and category in self.category_files:
+            self.load_subcategory_from_json(self.category_files.pop(category))
+        return super().get_subcategory(category)
+        
+    def lookup_softcode(self, softcode_key):
+        try:
+            return self.resolved_softcodes[softcode_key]
+        except KeyError:
+            pass
+        value = super().lookup_softcode(softcode_key)
+        # Allocating new keys never changes the value of an existing key, so
+        # resolutions stay valid until the categories are reloaded. VarLists
+        # change as mod variables are parsed, so those are never stored.
+        if isinstance(self.subcategories[parse_softcode_key(softcode_key)[0][0]], SoftcodeCategory):
+            self.resolved_softcodes[softcode_key] = value
+        return value
     
     def load_softcode_data(self):
+        self.resolved_softcodes = {}
         # Variables
         self.category_defs.append(SoftcodeListVariableCategory.definition)
         self.subcategories[sys.intern("VarLists")] = SoftcodeListVariableCategory()
         
-        for file in os.listdir(self.paths.softcodes_loc):
-            self.load_subcategory_from_json(file)
+        self.category_files = {sys.intern(os.path.splitext(file)[0]): file for file in os.listdir(self.paths.softcodes_loc)}
         
     def unload_softcode_data(self):
+        self.category_defs.clear()
+        self.category_files = {}
         self.subcategories = {}
+        self.resolved_softcodes = {}
     
     def add_subcategory(self, subcategory, data):
+        self.resolved_softcodes = {}
         self.category_defs.append(subcategory)
         self.subcategories[sys.intern(subcategory.name)] = SoftcodeCategory(subcategory, data)
         
     def load_subcategory_from_json(self, main_filename):
         try:
-            with JSONHandler(os.path.join(self.paths.softcodes_loc, f"Error reading '{main_filename}'")) as stream:
+            with JSONHandler(os.path.join(self.paths.softcodes_loc, main_filename), f"Error reading '{main_filename}'") as stream:
                 dct = stream
         except json.decoder.JSONDecodeError as e:
             print('error', e)
@@ -185,13 +257,14 @@ class SoftcodeManager(SoftcodeKey):
         
         
         cache_loc = os.path.join(self.paths.softcode_cache_loc, main_filename)
-        try:
-            with JSONHandler(cache_loc, f"Error reading '{main_filename}'") as data:
-                dct["codes"] = data
-        except json.decoder.JSONDecodeError as e:
-            print('error', e)
-        except Exception as e:
-            raise Exception(f"Attempted to read cached Softcode definitions \'{main_filename}\', encountered error: {e}") from e
+        if os.path.isfile(cache_loc):
+            try:
+                with JSONHandler(cache_loc, f"Error reading '{main_filename}'") as data:
+                    dct["codes"] = data
+            except json.decoder.JSONDecodeError as e:
+                print('error', e)
+            except Exception as e:
+                raise Exception(f"Attempted to read cached Softcode definitions \'{main_filename}\', encountered error: {e}") from e
         
         self.add_subcategory(category_def, dct["codes"])
         
@@ -205,8 +278,9 @@ class SoftcodeManager(SoftcodeKey):
     #     return cls(category_defs, {"Digimon": dct["codes"]})
         
     def dump_codes_to_json(self):
+        # Only categories that have allocated new keys need writing back
         for subcat_name, subcat in self.subcategories.items():
-            if hasattr(subcat, "get_data_as_serialisable"):
+            if hasattr(subcat, "is_dirty") and subcat.is_dirty():
                 filepath = os.path.join(self.paths.softcode_cache_loc, os.path.extsep.join((subcat_name, "json")))
                 parent_path = os.path.split(filepath)[0]
                 if not os.path.isdir(parent_path):
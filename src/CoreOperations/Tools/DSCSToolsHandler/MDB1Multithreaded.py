@@ -3,12 +3,21 @@ import sys
 
 from PyQt5 import QtCore
 
-from src.CoreOperations.Tools.DSCSToolsHandler.Runnables import MDB1FileExtractorRunnable
+from src.CoreOperations.Tools.DSCSToolsHandler.Runnables import MDB1BatchExtractorRunnable
 from src.Utils.Backups import get_backed_up_filepath_if_exists, default_MBD1s
-from libs.dscstools import DSCSTools
+from src.Utils.MDB1 import get_mdb1_toc_cache
 
 translate = QtCore.QCoreApplication.translate
 
+
+def split_into_batches(files, n_batches, min_batch_size=32):
+    """
+    Splits the files into at most n_batches contiguous runs.
+    """
+    batch_size = max(min_batch_size, -(-len(files) // max(n_batches, 1)))
+    return [files[i:i+batch_size] for i in range(0, len(files), batch_size)]
+
+
 class MDB1FilelistExtractor(QtCore.QObject):
     log = QtCore.pyqtSignal(str)
     updateLog = QtCore.pyqtSignal(str)
@@ -79,20 +88,32 @@ class MDB1FilelistExtractor(QtCore.QObject):
             self.log.emit(translate("Tools::MDB1::Debug", "---MDB1 filelist extractor message---"))
             os.makedirs(self.work_dir, exist_ok=True)
             self.timer.start(100)
+            
+            # Each archive's table of contents is only read once, and its
+            # files are extracted in archive order by a few workers that
+            # each keep the archive open
+            archive_files = {}
             for archive, filepath in self.file_archive_pairs:
-                job = MDB1FileExtractorRunnable(archive, filepath, self.__extract_function, self.__unpack_function)
-                job.signals.started.connect(self.jobStarted)
-                job.signals.raise_exception.connect(self.handleException)
-                job.signals.finished.connect(self.checkIfComplete)
-                self.threadpool.start(job)
+                if archive not in archive_files:
+                    archive_files[archive] = []
+                archive_files[archive].append(filepath)
+            for archive, filepaths in archive_files.items():
+                archive_path = self.archive_paths_lookup[archive]
+                toc = get_mdb1_toc_cache(self.ops.paths.mdb1_toc_cache_loc).get_toc(archive_path)
+                filepaths = sorted(filepaths, key=toc.get_offset)
+                for batch in split_into_batches(filepaths, self.threadpool.maxThreadCount()):
+                    job = MDB1BatchExtractorRunnable(archive_path, toc, batch, self.__extract_function, self.__unpack_function)
+                    job.signals.started.connect(self.jobStarted)
+                    job.signals.raise_exception.connect(self.handleException)
+                    job.signals.finished.connect(self.checkIfComplete)
+                    self.threadpool.start(job)
         except Exception as e:
             self.handleException(e)
 
-    def __extract_function(self, archive, filepath):
-        archive_path = self.archive_paths_lookup[archive]
+    def __extract_function(self, reader, filepath):
         destination_path = os.path.join(self.sdmm_resources_folder, "base_resources")
 
-        DSCSTools.extractMDB1File(archive_path, destination_path, filepath, True)
+        reader.extract_file(filepath, destination_path)
         
     def __unpack_function(self, filepath):
         destination_path = os.path.join(self.sdmm_resources_folder, "base_resources", filepath)
@@ -153,18 +174,16 @@ class MDB1Extractor(QtCore.QObject):
     @QtCore.pyqtSlot()
     def execute(self):
         try:
-            # The first file is '.\x00\x00\x00\x00', which we don't want to process...
-            fileinfos = DSCSTools.getArchiveInfo(self.archive_path).Files
-
-            assert fileinfos[0].FileName == '.\x00\x00\x00\x00', f"First filename was not the expected value of \'.\\x00\\x00\\x00\\x00\', found {fileinfos[0].FileName}."
-            fileinfos = fileinfos[1:]
-            self.njobs = len(fileinfos)
+            # The first file is '.\x00\x00\x00\x00', which isn't in the TOC
+            toc = get_mdb1_toc_cache(self.ops.paths.mdb1_toc_cache_loc).get_toc(self.archive_path)
+            filepaths = sorted(toc.entries, key=lambda filepath: toc.entries[filepath][0])
+            self.njobs = len(filepaths)
             
             self.log.emit(translate("Tools::MDB1::Debug", "---MDB1 extractor message---"))
             os.makedirs(self.extract_dir, exist_ok=True)
             self.timer.start(100)
-            for filepath in fileinfos:
-                job = MDB1FileExtractorRunnable(self.archive_path, filepath.FileName, self.__extract_function)
+            for batch in split_into_batches(filepaths, self.threadpool.maxThreadCount()):
+                job = MDB1BatchExtractorRunnable(self.archive_path, toc, batch, self.__extract_function)
                 job.signals.raise_exception.connect(self.clean_up_exception)
                 job.signals.started.connect(self.jobStarted)
                 job.signals.finished.connect(self.checkIfComplete)
@@ -172,5 +191,5 @@ class MDB1Extractor(QtCore.QObject):
         except Exception as e:
             self.clean_up_exception(e)
 
-    def __extract_function(self, _, filepath):
-        DSCSTools.extractMDB1File(self.archive_path, self.extract_dir, filepath, True)
+    def __extract_function(self, reader, filepath):
+        reader.extract_file(filepath, self.extract_dir)
@@ -3,28 +3,36 @@ import shutil
 
 from PyQt5 import QtCore
 
+from src.Utils.MDB1 import MDB1ArchiveReader
 from src.Utils.Signals import StandardRunnableSignals
 from libs.dscstools import DSCSTools
 from libs.nutcracker import NutCracker
 from libs.squirrel import sq
 
 
-class MDB1FileExtractorRunnable(QtCore.QRunnable):
-    def __init__(self, archive, file, extract_method, postaction=None):
+class MDB1BatchExtractorRunnable(QtCore.QRunnable):
+    """
+    Extracts several files from one archive through a single open handle.
+    Signals are emitted for each file.
+    """
+    def __init__(self, archive_path, toc, files, extract_method, postaction=None):
         super().__init__()
-        self.archive = archive
-        self.file = file
+        self.archive_path = archive_path
+        self.toc = toc
+        self.files = files
         self.extract_method = extract_method
         self.postaction = postaction
         self.signals = StandardRunnableSignals()
         
     def run(self):
         try:
-            self.signals.started.emit(self.file)
-            self.extract_method(self.archive, self.file)
-            if self.postaction is not None:
-                self.postaction(self.file)
-            self.signals.finished.emit()
+            with MDB1ArchiveReader(self.archive_path, self.toc) as reader:
+                for file in self.files:
+                    self.signals.started.emit(file)
+                    self.extract_method(reader, file)
+                    if self.postaction is not None:
+                        self.postaction(file)
+                    self.signals.finished.emit()
         except Exception as e:
             self.signals.raise_exception.emit(e)
 
@@ -14,7 +14,9 @@ from src.CoreOperations.ModRegistry import ModRegistry
 from src.CoreOperations.SoftcodeManager import SoftcodeManager
 from src.CoreOperations.Tools.DSCSToolsHandler import DSCSToolsHandler
 from src.CoreOperations.Tools.VGAudioHandler import VGAudioHandler
+from src.Utils.Digests import DigestStore
 from src.Utils.Threading import ThreadRunner, UIAccessThreadRunner
+from src.Utils.Verification import VerificationStore, verify_backups, VANILLA, MODDED, UNRECORDED, CORRUPT, MISSING, RECORDED
 from libs.dscstools import DSCSTools
 
 translate = QtCore.QCoreApplication.translate
@@ -50,7 +52,14 @@ class CoreOperations:
     def uninstall_mods(self):
         if not self.check_for_game_resources(): return
         self.main_window.ui.log(translate("CoreOps::UninstallMods", "Removing modded files..."))
-        shutil.copytree(self.paths.backups_loc, self.paths.game_resources_loc, dirs_exist_ok=True)
+        # Only files that differ from their backups are restored
+        digest_store = DigestStore(self.paths.backup_digests_loc)
+        n_restored, n_matching = self.backups_manager.restore_backups(self.paths.game_resources_loc, self.paths.backups_loc, digest_store)
+        digest_store.save()
+        self.main_window.ui.updateLog(translate("CoreOps::UninstallMods", "Removing modded files... restored {n_restored} files, {n_matching} already matched their backups.").format(n_restored=n_restored, n_matching=n_matching))
+        # Nothing installed can be assumed to still be in the game folder
+        if os.path.isfile(self.paths.installed_state_loc):
+            os.remove(self.paths.installed_state_loc)
         plugins_path = self.paths.game_plugins_loc
         error_msg = translate("CoreOps::UninstallMods", "Something is horribly wrong with the plugins path: {plugins_path}").format(plugins_path=plugins_path)
         assert len(plugins_path) > 7, error_msg
@@ -60,6 +69,45 @@ class CoreOperations:
                 os.remove(os.path.join(plugins_path, file))
         self.main_window.ui.log(translate("CoreOps::UninstallMods", "Vanilla files restored, plugins removed."))
 
+    def verify_backups(self, full=False):
+        if not self.check_for_game_resources(): return
+        if full:
+            self.main_window.ui.log(translate("CoreOps::VerifyBackups", "Verifying backups... re-reading every file..."))
+        else:
+            self.main_window.ui.log(translate("CoreOps::VerifyBackups", "Verifying backups..."))
+        
+        def workfunc(log, updateLog, enable_gui):
+            store = VerificationStore(self.paths.backup_snapshots_loc)
+            results = verify_backups(self.paths.game_resources_loc, self.paths.backups_loc, store, full)
+            store.save()
+            
+            status_names = {VANILLA:    translate("CoreOps::VerifyBackups", "vanilla"),
+                            MODDED:     translate("CoreOps::VerifyBackups", "modded"),
+                            UNRECORDED: translate("CoreOps::VerifyBackups", "modded (unrecorded)"),
+                            CORRUPT:    translate("CoreOps::VerifyBackups", "corrupt"),
+                            MISSING:    translate("CoreOps::VerifyBackups", "missing"),
+                            RECORDED:   translate("CoreOps::VerifyBackups", "recorded as vanilla")}
+            n_problems = 0
+            for result in results:
+                log.emit(translate("CoreOps::VerifyBackups", "> {file}: backup {backup_status}, game file {game_status}.").format(file=result.rel_path,
+                                                                                                                                   backup_status=status_names[result.backup_status],
+                                                                                                                                   game_status=status_names[result.game_status]))
+                if result.backup_bad_chunks:
+                    log.emit(translate("CoreOps::VerifyBackups", ">> {count} damaged blocks in backup.").format(count=result.backup_bad_chunks))
+                if result.game_bad_chunks:
+                    log.emit(translate("CoreOps::VerifyBackups", ">> {count} unrecognised blocks in game file.").format(count=result.game_bad_chunks))
+                if CORRUPT in (result.backup_status, result.game_status):
+                    n_problems += 1
+            if n_problems:
+                log.emit(translate("CoreOps::VerifyBackups", "Verification found {count} corrupt files. Corrupt game files can be fixed with 'Restore Backups'; corrupt backups need the game files to be verified through Steam.").format(count=n_problems))
+            else:
+                log.emit(translate("CoreOps::VerifyBackups", "Verification complete, no problems found."))
+            enable_gui.emit()
+            
+        thrd = UIAccessThreadRunner(self.main_window)
+        self.main_window.ui.disable_gui()
+        thrd.runInThread(self.main_window.ui, self.main_window, lambda : None, workfunc)
+
     def register_mod_filedialog(self):
         """
         Opens a file dialog and passes the path on to register_mod.
@@ -88,6 +136,9 @@ class CoreOperations:
                     if os.path.isfile(index_file):
                         os.remove(index_file)
                         n_purged += 1
+                    binary_index_file = os.path.join(self.paths.mods_loc, modfolder, self.paths.binary_index_file_name)
+                    if os.path.isfile(binary_index_file):
+                        os.remove(binary_index_file)
                 if n_purged:
                     updateLog.emit(translate("CoreOps::PurgeModIndices", "Purging mod indices... purge complete."))
                 else:
@@ -105,9 +156,10 @@ class CoreOperations:
         def workfunc(log, updateLog, enable_gui):
             removed_index = False
             removed_cache = False
-            if os.path.isfile(self.paths.patch_cache_index_loc):
-                os.remove(self.paths.patch_cache_index_loc)
-                removed_index = True
+            for index_loc in [self.paths.patch_cache_index_loc, self.paths.legacy_cache_index_loc]:
+                if os.path.isfile(index_loc):
+                    os.remove(index_loc)
+                    removed_index = True
             if os.path.isdir(self.paths.patch_cache_loc):
                 shutil.rmtree(self.paths.patch_cache_loc)
                 removed_cache = True
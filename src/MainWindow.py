@@ -153,6 +153,7 @@ class MainWindow(QtWidgets.QMainWindow):
                                 self.ops.purge_indices,
                                 self.ops.purge_cache,
                                 self.ops.purge_mm_resources,
+                                self.ops.verify_backups,
                                 self.ops.setCrashLogMethod,
                                 self.ops.getCrashLogMethods,
                                 self.ops.setBlockMethod,
@@ -1144,6 +1144,12 @@ class uiConfigTab(QtWidgets.QWidget):
         self.purge_resources_button = QtWidgets.QPushButton(parentWidget)
         self.purge_resources_button.setFixedWidth(120)
         
+        self.verify_backups_button = QtWidgets.QPushButton(parentWidget)
+        self.verify_backups_button.setFixedWidth(120)
+        
+        self.full_verify_backups_button = QtWidgets.QPushButton(parentWidget)
+        self.full_verify_backups_button.setFixedWidth(120)
+        
         self.crash_handle_layout = QtWidgets.QHBoxLayout()
         self.crash_handle_label = QtWidgets.QLabel()
         self.crash_handle_label.setFixedWidth(120)
@@ -1169,6 +1175,8 @@ class uiConfigTab(QtWidgets.QWidget):
         self.purge_indices_button.setText(translate("UI::PurgeModIndicesButton", "Purge mod indices"))
         self.purge_cache_button.setText(translate("UI::PurgeModCacheButton", "Purge mod cache"))
         self.purge_resources_button.setText(translate("UI::PurgeResourcesButton", "Purge mod resources"))
+        self.verify_backups_button.setText(translate("UI::VerifyBackupsButton", "Verify backups"))
+        self.full_verify_backups_button.setText(translate("UI::FullVerifyBackupsButton", "Full verify"))
         
         self.crash_handle_label.setText(translate("UI::CrashMethodBox", "Crash method: "))
         self.block_handle_label.setText(translate("UI::GameLaunchMethodBox", "Game launch method: "))
@@ -1190,6 +1198,8 @@ class uiConfigTab(QtWidgets.QWidget):
         self.buttons_layout.addWidget(self.purge_indices_button, 2, 0)
         self.buttons_layout.addWidget(self.purge_cache_button, 3, 0)
         self.buttons_layout.addWidget(self.purge_resources_button, 4, 0)
+        self.buttons_layout.addWidget(self.verify_backups_button, 5, 0)
+        self.buttons_layout.addWidget(self.full_verify_backups_button, 6, 0)
         
         self.layout.addLayout(self.game_location_layout, 0)
         self.layout.addLayout(self.buttons_layout, 1)
@@ -1198,7 +1208,7 @@ class uiConfigTab(QtWidgets.QWidget):
         self.setLayout(self.layout)
         
     def hook(self, find_gamelocation, update_dscstools, purge_softcodes, purge_indices,
-             purge_cache, purge_resources, update_crash_handler, crash_handler_options,
+             purge_cache, purge_resources, verify_backups, update_crash_handler, crash_handler_options,
              update_block_handler, block_handler_operations):
         self.crash_handler_options = crash_handler_options
         self.block_handler_operations = block_handler_operations
@@ -1209,6 +1219,9 @@ class uiConfigTab(QtWidgets.QWidget):
         self.purge_indices_button.clicked.connect(purge_indices)
         self.purge_cache_button.clicked.connect(purge_cache)
         self.purge_resources_button.clicked.connect(purge_resources)
+        # clicked passes the checked state, which must not reach 'full'
+        self.verify_backups_button.clicked.connect(lambda: verify_backups(full=False))
+        self.full_verify_backups_button.clicked.connect(lambda: verify_backups(full=True))
         self.crash_handle_box.currentIndexChanged.connect(update_crash_handler)
         self.block_handle_box.currentIndexChanged.connect(update_block_handler)
         
@@ -1231,6 +1244,8 @@ class uiConfigTab(QtWidgets.QWidget):
         self.purge_indices_button.setEnabled(active)
         self.purge_cache_button.setEnabled(active)
         self.purge_resources_button.setEnabled(active)
+        self.verify_backups_button.setEnabled(active)
+        self.full_verify_backups_button.setEnabled(active)
         self.crash_handle_box.setEnabled(active)
         self.block_handle_box.setEnabled(active)
 
@@ -0,0 +1,152 @@
+import os
+import struct
+
+
+# AFS2 archives are a header, a table of file ids, and a table of offsets,
+# followed by the file data:
+#   header   magic, flags, file count, block size
+#   ids      u16 per file
+#   offsets  u32 per file, plus one; file i starts at offset i rounded up to
+#            the block size, and ends at offset i+1
+# The second and third bytes of the flags give the size of each offset and
+# id, which DSCSTools only supports as 4 and 2.
+AFS2_MAGIC = b"AFS2"
+COPY_CHUNK_SIZE = 16*1024*1024
+
+header_struct = struct.Struct("<4sIIi")
+
+
+def align(offset, block_size):
+    return ((offset + block_size - 1) // block_size) * block_size
+
+
+def get_afs2_filename(idx):
+    return f"{idx:06x}.hca"
+
+
+def get_afs2_file_idx(filename):
+    """
+    Returns the position of a file named as extractAFS2 names files, or None
+    for any other name.
+    """
+    stem, ext = os.path.splitext(filename)
+    if len(stem) != 6 or ext.lower() != ".hca":
+        return None
+    try:
+        return int(stem, 16)
+    except ValueError:
+        return None
+
+
+class AFS2Index:
+    __slots__ = ("flags", "block_size", "ids", "offsets")
+
+    def __init__(self, flags, block_size, ids, offsets):
+        self.flags = flags
+        self.block_size = block_size
+        self.ids = ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_span(self, idx):
+        return align(self.offsets[idx], self.block_size), self.offsets[idx + 1]
+
+
+def read_afs2_index(archive_path):
+    with open(archive_path, 'rb') as F:
+        header = F.read(header_struct.size)
+        if len(header) != header_struct.size:
+            raise ValueError(f"Error: {archive_path} is not an AFS2 file.")
+        magic, flags, n_files, block_size = header_struct.unpack(header)
+        if magic != AFS2_MAGIC:
+            raise ValueError(f"Error: {archive_path} is not an AFS2 file. Value: {magic}")
+        offset_size = (flags >> 8) & 0xFF
+        id_size = (flags >> 16) & 0xFF
+        if offset_size != 4 or id_size != 2 or block_size <= 0:
+            raise ValueError(f"Error: {archive_path} has an unsupported AFS2 layout (offset size {offset_size}, id size {id_size}, block size {block_size}).")
+        ids = struct.unpack(f"<{n_files}H", F.read(2*n_files))
+        offsets = struct.unpack(f"<{n_files + 1}I", F.read(4*(n_files + 1)))
+    return AFS2Index(flags, block_size, ids, offsets)
+
+
+def copy_range(source, output, source_offset, size):
+    source.seek(source_offset)
+    while size > 0:
+        chunk = source.read(min(size, COPY_CHUNK_SIZE))
+        if len(chunk) == 0:
+            raise ValueError(f"Error: AFS2 archive '{source.name}' is truncated.")
+        output.write(chunk)
+        size -= len(chunk)
+
+
+def pack_afs2_incremental(source_path, target_path, replacements):
+    """
+    Writes a copy of the source archive with the files in replacements, a
+    {filename: filepath} dict, swapped in. Files are named as extractAFS2
+    names them; any other names are added after the files of the source,
+    in name order, as packAFS2 would order them.
+    Unchanged files are copied straight from the source along with their
+    padding, since every file starts on a block boundary in both archives.
+    """
+    index = read_afs2_index(source_path)
+    block_size = index.block_size
+
+    # Each entry is (id, source file idx, replacement filepath)
+    entries = [(file_id, idx, None) for idx, file_id in enumerate(index.ids)]
+    added_files = []
+    for filename, filepath in replacements.items():
+        idx = get_afs2_file_idx(filename)
+        if idx is not None and idx < len(entries):
+            entries[idx] = (entries[idx][0], None, filepath)
+        else:
+            added_files.append((filename, filepath))
+    # Ids of the source are kept, so added files are given ids after the
+    # largest one rather than after the file count, in case they differ
+    next_id = max(index.ids, default=-1) + 1
+    if next_id + len(added_files) > 0x10000:
+        raise ValueError(f"Error: AFS2 archive '{target_path}' would run out of file ids.")
+    for k, (filename, filepath) in enumerate(sorted(added_files)):
+        entries.append((next_id + k, None, filepath))
+
+    data_start = max(header_struct.size + 6*len(entries) + 4, block_size)
+    offsets = [data_start]
+
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    try:
+        with open(source_path, 'rb') as source, open(tmp_path, 'wb') as output:
+            i = 0
+            while i < len(entries):
+                _, source_idx, filepath = entries[i]
+                start = align(offsets[-1], block_size)
+                output.seek(start)
+                if filepath is not None:
+                    with open(filepath, 'rb') as F:
+                        data = F.read()
+                    output.write(data)
+                    offsets.append(start + len(data))
+                    i += 1
+                    continue
+
+                # Copy the run of source files that are still consecutive
+                run_end = i + 1
+                while run_end < len(entries) and entries[run_end][1] == entries[run_end - 1][1] + 1:
+                    run_end += 1
+                source_start, _ = index.get_span(source_idx)
+                _, source_end = index.get_span(entries[run_end - 1][1])
+                copy_range(source, output, source_start, source_end - source_start)
+                shift = start - source_start
+                offsets.extend(index.offsets[source_idx + 1 + j] + shift for j in range(run_end - i))
+                i = run_end
+
+            if offsets[-1] > 0xFFFFFFFF:
+                raise ValueError(f"Error: AFS2 archive '{target_path}' would exceed 4 GB.")
+            output.seek(0)
+            output.write(header_struct.pack(AFS2_MAGIC, index.flags, len(entries), block_size))
+            output.write(struct.pack(f"<{len(entries)}H", *(file_id for file_id, _, _ in entries)))
+            output.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
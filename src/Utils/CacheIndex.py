@@ -0,0 +1,67 @@
+import json
+import os
+import sqlite3
+
+
+class CacheIndex:
+    """
+    Maps each built pack target to the hash of the filepack that built it.
+    Backed by SQLite so that lookups and updates are per-target rather than
+    requiring the whole index to be read and rewritten, and so that a crash
+    mid-install can never leave a half-written index behind.
+    """
+    def __init__(self, filename, legacy_filename=None):
+        self.filename = filename
+        self.legacy_filename = legacy_filename
+        self.connection = None
+
+    def __enter__(self):
+        os.makedirs(os.path.split(self.filename)[0], exist_ok=True)
+        self.connection = sqlite3.connect(self.filename)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS cache_index (target TEXT PRIMARY KEY, hash TEXT NOT NULL) WITHOUT ROWID")
+        self.migrate_legacy_index()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+        self.connection.close()
+        self.connection = None
+
+    def migrate_legacy_index(self):
+        if self.legacy_filename is None or not os.path.isfile(self.legacy_filename):
+            return
+        try:
+            with open(self.legacy_filename, 'r', encoding="utf-8") as F:
+                legacy_index = json.load(F)
+        except json.decoder.JSONDecodeError:
+            # Nothing worth salvaging; those packs will just be rebuilt
+            legacy_index = {}
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO cache_index VALUES (?, ?)", legacy_index.items())
+        os.remove(self.legacy_filename)
+
+    def get(self, target, default=None):
+        row = self.connection.execute("SELECT hash FROM cache_index WHERE target = ?", (target,)).fetchone()
+        return default if row is None else row[0]
+
+    def __getitem__(self, target):
+        value = self.get(target)
+        if value is None:
+            raise KeyError(target)
+        return value
+
+    def __setitem__(self, target, hashval):
+        self.connection.execute("INSERT OR REPLACE INTO cache_index VALUES (?, ?)", (target, hashval))
+
+    def items(self):
+        return self.connection.execute("SELECT target, hash FROM cache_index").fetchall()
+
+    def update(self, items):
+        if hasattr(items, "items"):
+            items = items.items()
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO cache_index VALUES (?, ?)", items)
@@ -0,0 +1,57 @@
+import json
+import os
+from hashlib import blake2b
+
+from src.Utils.Settings import default_encoding
+
+
+def digest_file(filepath, chunk_size=1 << 20):
+    hasher = blake2b()
+    with open(filepath, 'rb') as F:
+        while (chunk := F.read(chunk_size)):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class DigestStore:
+    """
+    Maps source files to a digest of their contents.
+    Entries are keyed on the path, and are only valid whilst the size and
+    mtime of the file are unchanged - so a file is only read if it has been
+    touched since it was last digested.
+    """
+    __slots__ = ("filepath", "digests", "dirty")
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.digests = {}
+        self.dirty = False
+        if os.path.isfile(filepath):
+            try:
+                with open(filepath, 'r', encoding=default_encoding) as F:
+                    self.digests = json.load(F)
+            except json.JSONDecodeError:
+                # A corrupt store just means everything gets re-digested
+                self.digests = {}
+
+    def get_digest(self, filepath):
+        stat = os.stat(filepath)
+        entry = self.digests.get(filepath)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+
+        digest = digest_file(filepath)
+        self.digests[filepath] = [stat.st_size, stat.st_mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def save(self):
+        if not self.dirty:
+            return
+        # Drop any entries for files that no longer exist
+        self.digests = {path: entry for path, entry in self.digests.items() if os.path.isfile(path)}
+        tmp_filepath = f"{self.filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, 'w', encoding=default_encoding) as F:
+            json.dump(self.digests, F, separators=(',', ':'))
+        os.replace(tmp_filepath, self.filepath)
+        self.dirty = False
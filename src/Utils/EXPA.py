@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import struct
+from functools import lru_cache
+
+from src.Utils.Settings import default_encoding
+
+
+# Mirrors DSCSTools' packMBE, so that MBE tables can be packed straight from
+# memory rather than written out as CSVs and packed from a directory.
+PADDING_BYTE = b'\xCC'
+structures_loc = "structures"
+
+int_regex   = re.compile(r"^\s*([+-]?\d+)")
+float_regex = re.compile(r"^\s*([+-]?(?:\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?|inf(?:inity)?|nan))", re.IGNORECASE)
+
+
+def align(offset, value):
+    return (value - (offset % value)) % value
+
+
+def stoi(value):
+    match = int_regex.match(value)
+    if match is None:
+        raise ValueError(value)
+    return int(match.group(1))
+
+
+def stof(value):
+    match = float_regex.match(value)
+    if match is None:
+        raise ValueError(value)
+    return float(match.group(1))
+
+
+@lru_cache(maxsize=None)
+def get_structure_index():
+    with open(os.path.join(structures_loc, "structure.json"), 'r', encoding=default_encoding) as F:
+        return [(re.compile(pattern), filename) for pattern, filename in json.load(F).items()]
+
+
+@lru_cache(maxsize=None)
+def get_mbe_structure(mbe_path):
+    # Structure patterns are written with Windows path separators
+    mbe_path = mbe_path.replace('/', '\\')
+    for pattern, filename in get_structure_index():
+        if pattern.search(mbe_path):
+            break
+    else:
+        raise ValueError(f"Error: No fitting structure file found for {mbe_path}")
+    with open(os.path.join(structures_loc, filename), 'r', encoding=default_encoding) as F:
+        format_data = json.load(F)
+    return [(re.compile(f"^{table_pattern}$"), list(columns.items())) for table_pattern, columns in format_data.items()]
+
+
+def get_entry_size(columns):
+    entry_size = 0
+    for _, column_type in columns:
+        if column_type == "byte":
+            entry_size += 1
+        elif column_type == "short":
+            entry_size += 2 + align(entry_size, 2)
+        elif column_type in ("int", "float"):
+            entry_size += 4 + align(entry_size, 4)
+        elif column_type == "string":
+            entry_size += 8 + align(entry_size, 8)
+        elif column_type == "int array":
+            entry_size += 16 + align(entry_size, 8)
+    return entry_size + align(entry_size, 8)
+
+
+def conversion_error_message(value, column_type, mbe_name, table_name, column_name, column_idx, row_idx):
+    return f"Error packing {mbe_name}/{table_name}.csv: Value '{value}' cannot be converted to '{column_type}' at Row {row_idx}, Column {column_idx} '{column_name}'."
+
+
+def pack_mbe(mbe_path, tables, encoding=default_encoding):
+    """
+    Packs a dict of {table_name: (header, rows)} into the bytes of an MBE
+    file. Each row is a sequence of strings, as read from the table CSV.
+    """
+    structure = get_mbe_structure(mbe_path)
+    mbe_name = os.path.split(mbe_path)[1]
+
+    # Assign each table to the first definition that matches it, with the
+    # tables for each definition in the same order packMBE would find them
+    sorted_tables = [[] for _ in structure]
+    for table_name in tables:
+        for i, (table_pattern, _) in enumerate(structure):
+            if table_pattern.search(table_name):
+                sorted_tables[i].append(table_name)
+                break
+    for table_names in sorted_tables:
+        table_names.sort(key=lambda name: name + ".csv")
+
+    output = bytearray(b"EXPA\x00\x00\x00\x00")
+    chunks = []
+    n_tables = 0
+    for (_, columns), table_names in zip(structure, sorted_tables):
+        n_columns = len(columns)
+        entry_size = get_entry_size(columns)
+        for table_name in table_names:
+            n_tables += 1
+            header, rows = tables[table_name]
+            if len(header) != n_columns:
+                raise ValueError(f"Error: structure element count differs from input element count. The wrong structure might be used?\nExpected: {n_columns} | Found: {len(header)}")
+
+            name = table_name.encode(encoding)
+            name_size = (len(name) + 4) // 4 * 4
+            output += struct.pack('<I', name_size)
+            output += name.ljust(name_size, b'\x00')
+            output += struct.pack('<II', entry_size, len(rows))
+            output += b'\x00' * align(0x0C + name_size, 8)
+
+            for row_idx, row in enumerate(rows, start=1):
+                if len(row) != n_columns:
+                    raise ValueError(f"Error: structure element count differs from input element count. The wrong structure might be used?\nExpected: {n_columns} | Found: {len(row)}")
+                row_size = 0
+                for column_idx, (value, (column_name, column_type)) in enumerate(zip(row, columns)):
+                    try:
+                        if column_type == "byte":
+                            output += struct.pack('<B', stoi(value) & 0xFF)
+                            row_size += 1
+                        elif column_type == "short":
+                            padding_size = align(row_size, 2)
+                            output += PADDING_BYTE * padding_size
+                            output += struct.pack('<H', stoi(value) & 0xFFFF)
+                            row_size += 2 + padding_size
+                        elif column_type == "int":
+                            padding_size = align(row_size, 4)
+                            output += PADDING_BYTE * padding_size
+                            output += struct.pack('<i', stoi(value))
+                            row_size += 4 + padding_size
+                        elif column_type == "float":
+                            padding_size = align(row_size, 4)
+                            output += PADDING_BYTE * padding_size
+                            output += struct.pack('<f', stof(value))
+                            row_size += 4 + padding_size
+                        elif column_type == "string":
+                            padding_size = align(row_size, 8)
+                            if len(value):
+                                chunks.append((column_type, value, len(output) + padding_size, None))
+                            output += PADDING_BYTE * padding_size
+                            output += b'\x00' * 8
+                            row_size += 8 + padding_size
+                        elif column_type == "int array":
+                            padding_size = align(row_size, 8)
+                            if len(value):
+                                chunks.append((column_type, value, len(output) + 8 + padding_size, conversion_error_message(value, column_type, mbe_name, table_name, column_name, column_idx, row_idx)))
+                            array_size = value.count(' ') + 1 if len(value) else 0
+                            output += PADDING_BYTE * padding_size
+                            output += struct.pack('<I', array_size)
+                            output += PADDING_BYTE * 4
+                            output += b'\x00' * 8
+                            row_size += 16 + padding_size
+                    except (ValueError, OverflowError, struct.error) as e:
+                        raise ValueError(conversion_error_message(value, column_type, mbe_name, table_name, column_name, column_idx, row_idx)) from e
+                output += PADDING_BYTE * align(row_size, 8)
+
+    output += b"CHNK"
+    output += struct.pack('<I', len(chunks))
+    for column_type, value, offset, error_message in chunks:
+        if column_type == "string":
+            data = value.encode(encoding)
+            string_size = (len(data) + 5) // 4 * 4
+            output += struct.pack('<II', offset, string_size)
+            output += data.ljust(string_size, b'\x00')
+        else:
+            numbers = value.split(' ')
+            output += struct.pack('<II', offset, len(numbers) * 4)
+            try:
+                output += struct.pack(f'<{len(numbers)}i', *(stoi(number) for number in numbers))
+            except (ValueError, OverflowError, struct.error) as e:
+                raise ValueError(error_message) from e
+
+    output[4:8] = struct.pack('<I', n_tables)
+    return bytes(output)
@@ -0,0 +1,40 @@
+import os
+import shutil
+import sys
+
+
+def try_reflink(src, dst):
+    """
+    Makes a copy-on-write clone of src at dst on filesystems that support
+    it. Returns False if the clone could not be made.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    FICLONE = 0x40049409
+    try:
+        with open(src, 'rb') as src_stream, open(dst, 'wb') as dst_stream:
+            fcntl.ioctl(dst_stream.fileno(), FICLONE, src_stream.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def clone_file(src, dst):
+    """
+    Puts a copy of src at dst as cheaply as possible: a reflink where the
+    filesystem supports it, otherwise a full copy. dst is replaced rather
+    than written over, so a partial copy never takes its place.
+    Hardlinks are never made, since Steam and other tools write to the game
+    folder in place, which would alter every linked copy.
+    """
+    os.makedirs(os.path.split(dst)[0], exist_ok=True)
+    tmp_dst = f"{dst}.{os.getpid()}.tmp"
+    if os.path.lexists(tmp_dst):
+        os.remove(tmp_dst)
+    if not try_reflink(src, tmp_dst):
+        shutil.copy2(src, tmp_dst)
+    os.replace(tmp_dst, dst)
@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+
+from src.Utils.JSONHandler import JSONHandler
+
+
+class FilelistIndex:
+    """
+    Read-only lookup of the vanilla archive that each game file lives in, as
+    listed in filelist.json. The filenames are kept as a sorted list and
+    searched by bisection, with the archive of each file stored as a single
+    byte, which takes far less memory than the parsed JSON dict.
+    """
+    __slots__ = ("filenames", "archive_ids", "archives")
+
+    def __init__(self, filelist):
+        self.archives = sorted(set(filelist.values()))
+        archive_ids = {archive: i for i, archive in enumerate(self.archives)}
+        self.filenames = [sys.intern(filename) for filename in sorted(filelist)]
+        self.archive_ids = array('B', (archive_ids[filelist[filename]] for filename in self.filenames))
+
+    def find(self, filename):
+        idx = bisect_left(self.filenames, filename)
+        if idx != len(self.filenames) and self.filenames[idx] == filename:
+            return idx
+        return None
+
+    def get(self, filename, default=None):
+        idx = self.find(filename)
+        if idx is None:
+            return default
+        return self.archives[self.archive_ids[idx]]
+
+    def __getitem__(self, filename):
+        idx = self.find(filename)
+        if idx is None:
+            raise KeyError(filename)
+        return self.archives[self.archive_ids[idx]]
+
+    def __contains__(self, filename):
+        return self.find(filename) is not None
+
+    def __len__(self):
+        return len(self.filenames)
+
+
+filelist_indices = {}
+filelist_lock = threading.Lock()
+
+
+def get_filelist_index(config_path):
+    """
+    filelist.json is parsed once per process, the first time it is needed,
+    and the index is shared by all callers afterwards.
+    """
+    filepath = os.path.abspath(os.path.join(config_path, "filelist.json"))
+    with filelist_lock:
+        if filepath not in filelist_indices:
+            with JSONHandler(filepath, "Error reading 'filelist.json'") as stream:
+                filelist_indices[filepath] = FilelistIndex(stream)
+        return filelist_indices[filepath]
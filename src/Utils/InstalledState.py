@@ -0,0 +1,72 @@
+import json
+import os
+from hashlib import blake2b
+
+from src.Utils.Settings import default_encoding
+
+
+def get_stat_key(filepath):
+    stat = os.stat(filepath)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def digest_install_inputs(inputs, digest_store):
+    """
+    Combines the digests of the (name, filepath) inputs of an archive, so
+    that archives built from identical inputs get identical digests
+    regardless of where the inputs live.
+    """
+    hasher = blake2b()
+    for name, filepath in sorted(inputs):
+        hasher.update(name.replace(os.sep, '/').encode(default_encoding))
+        hasher.update(b'\x00')
+        hasher.update(digest_store.get_digest(filepath).encode(default_encoding))
+        hasher.update(b'\x00')
+    return hasher.hexdigest()
+
+
+class InstalledState:
+    """
+    Records the inputs each archive was last installed from, and the size
+    and mtime of the files it wrote to the game folder. An archive is only
+    up-to-date whilst both are unchanged, in which case packing it again
+    would produce the files that are already installed.
+    """
+    __slots__ = ("filepath", "archives")
+
+    version = 1
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.archives = {}
+        if os.path.isfile(filepath):
+            try:
+                with open(filepath, 'r', encoding=default_encoding) as F:
+                    state = json.load(F)
+                if state.get("version") == self.version:
+                    self.archives = state["archives"]
+            except (json.JSONDecodeError, KeyError):
+                # A corrupt state just means every archive gets packed
+                self.archives = {}
+
+    def is_installed(self, archive_key, inputs_digest, output_paths):
+        entry = self.archives.get(archive_key)
+        if entry is None or entry["inputs"] != inputs_digest or set(entry["outputs"]) != set(output_paths):
+            return False
+        for output_path, stat_key in entry["outputs"].items():
+            if not os.path.isfile(output_path) or get_stat_key(output_path) != stat_key:
+                return False
+        return True
+
+    def set_installed(self, archive_key, inputs_digest, output_paths):
+        self.archives[archive_key] = {"inputs": inputs_digest,
+                                      "outputs": {output_path: get_stat_key(output_path) for output_path in output_paths}}
+
+    def discard(self, archive_key):
+        self.archives.pop(archive_key, None)
+
+    def save(self):
+        tmp_filepath = f"{self.filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, 'w', encoding=default_encoding) as F:
+            json.dump({"version": self.version, "archives": self.archives}, F, separators=(',', ':'))
+        os.replace(tmp_filepath, self.filepath)
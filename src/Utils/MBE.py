@@ -1,5 +1,5 @@
 import csv
-import os
+import io
 
 from src.Utils.Settings import default_encoding
 from src.Utils.Softcodes import replace_softcodes
@@ -7,31 +7,25 @@ from src.Utils.Softcodes import replace_softcodes
 
 def mbetable_to_dict(result, filepath, id_size, softcodes, softcode_lookup, encoding=default_encoding):
     header = None
-    try:
-        if softcodes is None:
-            working_fp = filepath
-        else:
-            working_fp = filepath + ".working"
-            with open(filepath, 'rb') as F, open(working_fp, 'wb') as G:
-                G.write(replace_softcodes(F.read(), softcodes, softcode_lookup))
-                
-                
-        with open(working_fp, 'r', newline='', encoding=encoding) as F:
-            csvreader = csv.reader(F, delimiter=',', quotechar='"')
-            csvreader_data = iter(csvreader)
-            header = next(csvreader_data)
-            for line in csvreader_data:
-                if not(line):
-                    continue
-                data = line
-                # Might have to go careful that there are no duplicates
-                record_id = tuple(data[:id_size])
-                result[record_id] = data[id_size:]
-    except Exception as e:
-        raise e
-    finally:
-        if softcodes is not None:
-            os.remove(working_fp)
+    if softcodes is None:
+        F = open(filepath, 'r', newline='', encoding=encoding)
+    else:
+        # Substitute the softcodes in memory and parse the result directly,
+        # rather than going through a working file on disk
+        with open(filepath, 'rb') as G:
+            text = replace_softcodes(G.read(), softcodes, softcode_lookup).decode(encoding)
+        F = io.StringIO(text, newline='')
+    with F:
+        csvreader = csv.reader(F, delimiter=',', quotechar='"')
+        csvreader_data = iter(csvreader)
+        header = next(csvreader_data)
+        for line in csvreader_data:
+            if not(line):
+                continue
+            data = line
+            # Might have to go careful that there are no duplicates
+            record_id = tuple(data[:id_size])
+            result[record_id] = data[id_size:]
     return header, result
 
 def dict_to_mbetable(filepath, header, result, encoding=default_encoding):
@@ -40,3 +34,50 @@ def dict_to_mbetable(filepath, header, result, encoding=default_encoding):
         csvwriter.writerow(header)
         for key, value in result.items():
             csvwriter.writerow(([*key, *value]))
+
+def read_mbetable_rows(filepath, encoding=default_encoding):
+    with open(filepath, 'r', newline='', encoding=encoding) as F:
+        csvreader = iter(csv.reader(F, delimiter=',', quotechar='"'))
+        header = next(csvreader)
+        return header, [line for line in csvreader if line]
+
+def dict_to_mbetable_rows(result):
+    return [[*key, *value] for key, value in result.items()]
+
+#####################
+# RECORD OPERATIONS #
+#####################
+# Applied once per mod to every record it patches, so these are the hottest
+# loops of an install: records are only rebuilt when they actually change.
+def merge_records(result, records, max_records):
+    for key, record in records.items():
+        record = record[:max_records]
+        existing = result.get(key)
+        if existing is not None and "" in record:
+            # Blank fields keep whatever the table already holds
+            if len(record) <= len(existing):
+                record = [(old if value == "" else value) for old, value in zip(existing, record)]
+            else:
+                record = [(existing[i] if value == "" else value) for i, value in enumerate(record)]
+        result[key] = record
+
+def append_records(result, records, max_records, fill_value):
+    for key, record in records.items():
+        nonzero_data = [elem for elem in result.get(key, ()) if elem != fill_value]
+        present = set(nonzero_data)
+        nonzero_data.extend([elem for elem in record if elem not in present])
+        del nonzero_data[max_records:]
+        nonzero_data.extend([fill_value]*(max_records - len(nonzero_data)))
+        result[key] = nonzero_data
+
+def remove_records(result, records, max_records, fill_value):
+    for key, record in records.items():
+        existing = result.get(key, ())
+        # Only fill values named by the record are dropped
+        if fill_value in record:
+            nonzero_data = [elem for elem in existing if elem != fill_value]
+        else:
+            nonzero_data = list(existing)
+        nonzero_data.extend([fill_value]*(max_records - len(nonzero_data)))
+        del nonzero_data[max_records:]
+        result[key] = nonzero_data
@@ -0,0 +1,402 @@
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import threading
+from functools import lru_cache
+from hashlib import blake2b
+
+from libs.dscstools import DSCSTools
+
+
+# Reads files out of MDB1 archives directly, so that many files can be
+# extracted through one open handle with the table of contents read once,
+# rather than DSCSTools.extractMDB1File re-opening and re-reading the
+# archive header for every file.
+MDB1_MAGIC = 0x3142444D
+MDB1_CRYPTED_MAGIC = 0x608D920C
+# Encrypted archives are XORed with two repeating keys of lengths 997 and
+# 991, so the combined key repeats every 997*991 bytes
+KEYSTREAM_PERIOD = 997*991
+# Unchanged data is re-encrypted in chunks of this size while repacking
+COPY_CHUNK_SIZE = 16*1024*1024
+
+header_struct     = struct.Struct("<IHHIII") # magic, file entries, name entries, data entries, data start, total size
+file_entry_struct = struct.Struct("<hHHH")   # compare bit, data id, left, right
+data_entry_struct = struct.Struct("<III")    # offset, size, compressed size
+NAME_ENTRY_SIZE = 0x40
+NO_DATA = 0xFFFF
+
+
+@lru_cache(maxsize=None)
+def get_keystream():
+    """
+    Reads the combined key out of DSCSTools by encrypting zeros, so that
+    the keys themselves only live in DSCSTools.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zeros_path = os.path.join(tmp_dir, "zeros")
+        keystream_path = os.path.join(tmp_dir, "keystream")
+        with open(zeros_path, 'wb') as F:
+            F.write(bytes(KEYSTREAM_PERIOD))
+        DSCSTools.crypt(zeros_path, keystream_path)
+        with open(keystream_path, 'rb') as F:
+            keystream = F.read()
+    if len(keystream) != KEYSTREAM_PERIOD:
+        raise ValueError(f"Error: expected a {KEYSTREAM_PERIOD}-byte MDB1 keystream, got {len(keystream)} bytes.")
+    return keystream
+
+
+def crypt_bytes(data, offset):
+    """
+    Encrypts or decrypts data that lives at the given offset in an archive.
+    """
+    keystream = get_keystream()
+    size = len(data)
+    start = offset % KEYSTREAM_PERIOD
+    key = keystream[start:start + size]
+    while len(key) < size:
+        key += keystream[:size - len(key)]
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(key, 'little')).to_bytes(size, 'little')
+
+
+def normalise_mdb1_path(filepath):
+    # Archive paths use Windows separators, and three-letter extensions are
+    # padded out to four characters with a space
+    return filepath.replace(os.sep, '\\').replace('/', '\\').rstrip(' \x00')
+
+
+def get_name_entry_path(name_entry):
+    extension = name_entry[:4]
+    name = name_entry[4:].split(b'\x00', 1)[0]
+    return normalise_mdb1_path(name.decode("utf8") + "." + extension.decode("utf8"))
+
+
+class MDB1Tables:
+    """
+    The decrypted header tables of an MDB1 archive. File entries are
+    (compare bit, data id, left, right) tuples, name entries are the raw
+    0x40-byte records, and data entries are (offset, size, compressed size)
+    tuples.
+    """
+    __slots__ = ("encrypted", "data_start", "file_entries", "name_entries", "data_entries")
+
+    def __init__(self, encrypted, data_start, file_entries, name_entries, data_entries):
+        self.encrypted = encrypted
+        self.data_start = data_start
+        self.file_entries = file_entries
+        self.name_entries = name_entries
+        self.data_entries = data_entries
+
+    def get_paths(self):
+        return [get_name_entry_path(name_entry) for name_entry in self.name_entries]
+
+
+def read_mdb1_tables(archive_path):
+    with open(archive_path, 'rb') as F:
+        header = F.read(header_struct.size)
+        if len(header) != header_struct.size:
+            raise ValueError(f"Error: {archive_path} is not a MDB1 file.")
+        magic, = struct.unpack_from("<I", header)
+        if magic not in (MDB1_MAGIC, MDB1_CRYPTED_MAGIC):
+            raise ValueError(f"Error: {archive_path} is not a MDB1 file. Value: {magic}")
+        encrypted = magic == MDB1_CRYPTED_MAGIC
+        if encrypted:
+            header = crypt_bytes(header, 0)
+        _, n_file_entries, n_name_entries, n_data_entries, data_start, _ = header_struct.unpack(header)
+
+        file_table_size = n_file_entries*file_entry_struct.size
+        name_table_size = n_name_entries*NAME_ENTRY_SIZE
+        tables = F.read(file_table_size + name_table_size + n_data_entries*data_entry_struct.size)
+    if encrypted:
+        tables = crypt_bytes(tables, header_struct.size)
+
+    file_entries = list(struct.iter_unpack(file_entry_struct.format, tables[:file_table_size]))
+    name_entries = [tables[offset:offset + NAME_ENTRY_SIZE] for offset in range(file_table_size, file_table_size + name_table_size, NAME_ENTRY_SIZE)]
+    data_entries = list(struct.iter_unpack(data_entry_struct.format, tables[file_table_size + name_table_size:]))
+    return MDB1Tables(encrypted, data_start, file_entries, name_entries, data_entries)
+
+
+class MDB1ArchiveTOC:
+    """
+    The location of every file in an MDB1 archive, as
+    {path: (data offset, size, compressed size)}.
+    """
+    __slots__ = ("encrypted", "data_start", "entries")
+
+    def __init__(self, encrypted, data_start, entries):
+        self.encrypted = encrypted
+        self.data_start = data_start
+        self.entries = entries
+
+    def get_offset(self, filepath):
+        entry = self.entries.get(normalise_mdb1_path(filepath))
+        return -1 if entry is None else entry[0]
+
+
+def read_mdb1_toc(archive_path):
+    tables = read_mdb1_tables(archive_path)
+    entries = {}
+    for (_, data_id, _, _), name_entry in zip(tables.file_entries, tables.name_entries):
+        # The root node holds no data
+        if data_id != NO_DATA:
+            entries[get_name_entry_path(name_entry)] = tables.data_entries[data_id]
+    return MDB1ArchiveTOC(tables.encrypted, tables.data_start, entries)
+
+
+class MDB1TOCCache:
+    """
+    Persists the table of contents of each archive, keyed on the size and
+    mtime of the archive, so that archives only need to be parsed again
+    once they have changed. Tables of contents are also kept in memory, and
+    are shared between callers.
+    """
+    __slots__ = ("cache_loc", "tocs", "lock")
+    
+    version = 2
+    
+    def __init__(self, cache_loc):
+        self.cache_loc = cache_loc
+        self.tocs = {}
+        self.lock = threading.Lock()
+        
+    def get_toc(self, archive_path):
+        archive_path = os.path.abspath(archive_path)
+        stat = os.stat(archive_path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self.tocs.get(archive_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        pickle_path = os.path.join(self.cache_loc, blake2b(archive_path.encode("utf8"), digest_size=16).hexdigest() + ".pickle")
+        toc = None
+        if os.path.isfile(pickle_path):
+            try:
+                with open(pickle_path, 'rb') as F:
+                    version, cached_key, encrypted, data_start, entries = pickle.load(F)
+                if version == self.version and cached_key == key:
+                    toc = MDB1ArchiveTOC(encrypted, data_start, entries)
+            except Exception:
+                toc = None
+        if toc is None:
+            toc = read_mdb1_toc(archive_path)
+            os.makedirs(self.cache_loc, exist_ok=True)
+            tmp_path = f"{pickle_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as F:
+                pickle.dump((self.version, key, toc.encrypted, toc.data_start, toc.entries), F, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, pickle_path)
+        
+        with self.lock:
+            self.tocs[archive_path] = (key, toc)
+        return toc
+
+
+toc_caches = {}
+toc_caches_lock = threading.Lock()
+
+def get_mdb1_toc_cache(cache_loc):
+    with toc_caches_lock:
+        if cache_loc not in toc_caches:
+            toc_caches[cache_loc] = MDB1TOCCache(cache_loc)
+        return toc_caches[cache_loc]
+
+
+class MDB1ArchiveReader:
+    """
+    Extracts files from an MDB1 archive through a single open handle.
+    Extracting files in order of their offsets keeps reads sequential.
+    """
+    __slots__ = ("archive_path", "toc", "stream")
+
+    def __init__(self, archive_path, toc=None):
+        self.archive_path = archive_path
+        self.toc = read_mdb1_toc(archive_path) if toc is None else toc
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = open(self.archive_path, 'rb')
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stream.close()
+        self.stream = None
+
+    def read_file(self, filepath, decompress=True):
+        entry = self.toc.entries.get(normalise_mdb1_path(filepath))
+        if entry is None:
+            raise ValueError(f"MDB1 File Extraction: File '{filepath}' not found in archive '{self.archive_path}'.")
+        offset, size, compressed_size = entry
+
+        is_compressed = decompress and compressed_size != size
+        offset += self.toc.data_start
+        self.stream.seek(offset)
+        data = self.stream.read(compressed_size if is_compressed or not decompress else size)
+        if self.toc.encrypted:
+            data = crypt_bytes(data, offset)
+        if is_compressed:
+            data = DSCSTools.dobozDecompressBytes(data)
+        return data
+
+    def extract_file(self, filepath, destination_dir, decompress=True):
+        data = self.read_file(filepath, decompress)
+        path = os.path.join(destination_dir, *normalise_mdb1_path(filepath).split('\\'))
+        os.makedirs(os.path.split(path)[0], exist_ok=True)
+        with open(path, 'wb') as F:
+            F.write(data)
+
+
+#####################
+# INCREMENTAL PACKS #
+#####################
+def get_doboz_sizes(data):
+    """
+    Returns the (uncompressed size, compressed size) of a doboz stream,
+    or None if the data is not one that packMDB1 would store as-is.
+    """
+    if not len(data):
+        return None
+    attributes = data[0]
+    size_coded_size = ((attributes >> 3) & 7) + 1
+    if size_coded_size not in (1, 2, 4, 8) or len(data) < 1 + 2*size_coded_size:
+        return None
+    uncompressed_size = int.from_bytes(data[1:1 + size_coded_size], 'little')
+    compressed_size = int.from_bytes(data[1 + size_coded_size:1 + 2*size_coded_size], 'little')
+    if (attributes & 7) != 0 or uncompressed_size == 0 or compressed_size != len(data):
+        return None
+    return uncompressed_size, compressed_size
+
+
+def build_mdb1_tree(paths, work_dir):
+    """
+    Lets DSCSTools lay out the search tree for a new set of paths, by
+    packing empty placeholders for every path and reading the tables back.
+    """
+    tree_dir = os.path.join(work_dir, "tree")
+    tree_archive = os.path.join(work_dir, "tree.mvgl")
+    for path in paths:
+        placeholder = os.path.join(tree_dir, *path.split('\\'))
+        os.makedirs(os.path.split(placeholder)[0], exist_ok=True)
+        open(placeholder, 'wb').close()
+    DSCSTools.packMDB1(tree_dir, tree_archive, DSCSTools.CompressMode.none, False, False)
+    tables = read_mdb1_tables(tree_archive)
+    shutil.rmtree(tree_dir)
+    os.remove(tree_archive)
+    return tables
+
+
+def copy_mdb1_data(source, output, source_tables, source_offset, output_offset, size, encrypt):
+    source_offset += source_tables.data_start
+    source.seek(source_offset)
+    while size > 0:
+        chunk = source.read(min(size, COPY_CHUNK_SIZE))
+        if len(chunk) == 0:
+            raise ValueError(f"Error: MDB1 archive '{source.name}' is truncated.")
+        if source_tables.encrypted != encrypt or (source_offset - output_offset) % KEYSTREAM_PERIOD:
+            if source_tables.encrypted:
+                chunk = crypt_bytes(chunk, source_offset)
+            if encrypt:
+                chunk = crypt_bytes(chunk, output_offset)
+        output.write(chunk)
+        source_offset += len(chunk)
+        output_offset += len(chunk)
+        size -= len(chunk)
+
+
+def pack_mdb1_incremental(source_path, target_path, replacements, work_dir, encrypt=True):
+    """
+    Writes a copy of the source archive with the files in replacements, a
+    {archive path: filepath} dict, added or swapped in.
+    The stored bytes of every other file are streamed straight from the
+    source archive, so nothing is extracted or recompressed. Replacement
+    files are stored the same way packMDB1 stores them with compression
+    off: doboz streams as-is, and anything else uncompressed.
+    """
+    source_tables = read_mdb1_tables(source_path)
+    source_paths = source_tables.get_paths()
+    source_data_ids = {path: data_id for path, (_, data_id, _, _) in zip(source_paths, source_tables.file_entries) if data_id != NO_DATA}
+    replacements = {normalise_mdb1_path(path): filepath for path, filepath in replacements.items()}
+
+    # The search tree only depends on the set of paths, so the source tree
+    # can be kept unless files are being added
+    if all(path in source_data_ids for path in replacements):
+        tables = source_tables
+        paths = source_paths
+    else:
+        tables = build_mdb1_tree(sorted({*source_data_ids, *replacements}), work_dir)
+        paths = tables.get_paths()
+
+    # Unchanged data is written in the order it appears in the source, so
+    # that runs of it can be copied in large sequential chunks. Files that
+    # share data in the source keep sharing it.
+    source_payloads = {}
+    replacement_payloads = []
+    for path, (_, data_id, _, _) in zip(paths, tables.file_entries):
+        if data_id == NO_DATA:
+            continue
+        if path in replacements:
+            replacement_payloads.append(path)
+        else:
+            source_payloads[source_data_ids[path]] = None
+    source_payloads = sorted(source_payloads, key=lambda data_id: source_tables.data_entries[data_id][0])
+
+    data_start = header_struct.size + len(tables.file_entries)*file_entry_struct.size + len(tables.name_entries)*NAME_ENTRY_SIZE \
+               + (len(source_payloads) + len(replacement_payloads))*data_entry_struct.size
+    data_entries = []
+    new_source_ids = {}
+    new_replacement_ids = {}
+    offset = 0
+
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    try:
+        with open(source_path, 'rb') as source, open(tmp_path, 'wb') as output:
+            output.seek(data_start)
+            run_source_offset = None
+            run_output_offset = 0
+            run_size = 0
+            for data_id in source_payloads:
+                source_offset, size, compressed_size = source_tables.data_entries[data_id]
+                if run_source_offset is not None and source_offset != run_source_offset + run_size:
+                    copy_mdb1_data(source, output, source_tables, run_source_offset, data_start + run_output_offset, run_size, encrypt)
+                    run_source_offset = None
+                if run_source_offset is None:
+                    run_source_offset = source_offset
+                    run_output_offset = offset
+                    run_size = 0
+                run_size += compressed_size
+                new_source_ids[data_id] = len(data_entries)
+                data_entries.append((offset, size, compressed_size))
+                offset += compressed_size
+            if run_source_offset is not None:
+                copy_mdb1_data(source, output, source_tables, run_source_offset, data_start + run_output_offset, run_size, encrypt)
+
+            for path in replacement_payloads:
+                with open(replacements[path], 'rb') as F:
+                    data = F.read()
+                sizes = get_doboz_sizes(data)
+                size = len(data) if sizes is None else sizes[0]
+                if encrypt:
+                    data = crypt_bytes(data, data_start + offset)
+                output.write(data)
+                new_replacement_ids[path] = len(data_entries)
+                data_entries.append((offset, size, len(data)))
+                offset += len(data)
+
+            file_entries = bytearray()
+            for path, (compare_bit, data_id, left, right) in zip(paths, tables.file_entries):
+                if data_id != NO_DATA:
+                    data_id = new_replacement_ids[path] if path in replacements else new_source_ids[source_data_ids[path]]
+                file_entries += file_entry_struct.pack(compare_bit, data_id, left, right)
+            header = header_struct.pack(MDB1_MAGIC, len(tables.file_entries), len(tables.name_entries), len(data_entries), data_start, data_start + offset) \
+                   + file_entries \
+                   + b''.join(tables.name_entries) \
+                   + b''.join(data_entry_struct.pack(*entry) for entry in data_entries)
+            if encrypt:
+                header = crypt_bytes(header, 0)
+            output.seek(0)
+            output.write(header)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -24,6 +24,46 @@ def calc_has_dir_changed_info(path):
             max_time = max([os.path.getmtime(filepath), max_time])
     return max_time, contents_hash.hexdigest()
 
+def get_file_stats(dirpath):
+    # On Windows the stats come with the directory listing, so the files of a
+    # directory cost a single call rather than one stat each
+    file_stats = {}
+    with os.scandir(dirpath) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                file_stats[entry.name] = [stat.st_size, stat.st_mtime_ns]
+    return file_stats
+
+
+def take_stat_snapshot(path):
+    """
+    Records the mtime of every directory under path, and the size and mtime
+    of the files directly inside each one.
+    """
+    snapshot = {}
+    for root, subdirs, files in os.walk(path):
+        snapshot[os.path.relpath(root, path)] = [os.stat(root).st_mtime_ns, get_file_stats(root)]
+    return snapshot
+
+
+def has_dir_changed_since_snapshot(path, snapshot):
+    try:
+        # Adding, removing or renaming anything changes the mtime of the parent
+        # directory, so check every directory before touching any files
+        for directory, (mtime_ns, _) in snapshot.items():
+            if os.stat(os.path.join(path, directory)).st_mtime_ns != mtime_ns:
+                return True
+        # Editing a file in place leaves its directory's mtime alone, so the
+        # files still have to be checked - but one listing per directory
+        for directory, (_, file_stats) in snapshot.items():
+            if len(file_stats) and get_file_stats(os.path.join(path, directory)) != file_stats:
+                return True
+    except OSError:
+        return True
+    return False
+
+
 def path_is_parent(parent_path, child_path):
     """https://stackoverflow.com/a/37095733"""
     # Smooth out relative path names, note: if you are concerned about symbolic links, you should use os.path.realpath too
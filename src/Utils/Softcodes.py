@@ -6,17 +6,21 @@ def replace_softcodes(text_bytes, text_softcodes, softcode_lookup):
     if text_softcodes is not None:
         all_replacements = []
         for match, offsets in text_softcodes.items():
-            value = softcode_lookup[match]
+            value = str(softcode_lookup[match]).encode('utf8')
             for offset, softcode_length in offsets:
                 all_replacements.append((offset, value, softcode_length))
-        all_replacements = sorted(all_replacements, key=lambda x : x[0])
+        all_replacements.sort(key=lambda x : x[0])
         
-        offset_adjustment = 0
+        # Assemble the output in a single pass rather than re-slicing the
+        # whole text for every replacement
+        segments = []
+        position = 0
+        text_view = memoryview(text_bytes)
         for offset, value, softcode_length in all_replacements:
-            text_a = text_bytes[:offset + offset_adjustment]
-            text_b = text_bytes[offset + offset_adjustment + softcode_length:]
-            str_value = str(value).encode('utf8')
-            text_bytes = text_a + str_value + text_b
-            offset_adjustment += len(str_value) - softcode_length
+            segments.append(text_view[position:offset])
+            segments.append(value)
+            position = offset + softcode_length
+        segments.append(text_view[position:])
+        text_bytes = b''.join(segments)
         
-    return text_bytes
\ No newline at end of file
+    return text_bytes
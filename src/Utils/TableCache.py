@@ -0,0 +1,125 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from src.Utils.Digests import DigestStore
+from src.Utils.MBE import read_mbetable_rows
+from src.Utils.Settings import default_encoding
+
+
+class ParsedTableCache:
+    """
+    Caches parsed MBE/CSV tables as (header, rows), keyed on the digest of
+    the file they were parsed from. Recently-used tables are kept in memory
+    so that they are shared between patchers; vanilla tables are also
+    pickled to disk so that later installs can skip parsing altogether.
+    Cached rows are shared between callers and must not be modified.
+    """
+    __slots__ = ("cache_loc", "max_tables", "tables", "digest_store", "reported_digests", "lock")
+    
+    def __init__(self, cache_loc, max_tables=256):
+        self.cache_loc = cache_loc
+        self.max_tables = max_tables
+        self.tables = OrderedDict()
+        os.makedirs(cache_loc, exist_ok=True)
+        self.digest_store = DigestStore(os.path.join(cache_loc, "DIGESTS.json"))
+        self.reported_digests = dict(self.digest_store.digests)
+        self.lock = threading.Lock()
+        
+    def get_rows(self, filepath, encoding=default_encoding, loader=None, subkey="", persist=True):
+        """
+        If a loader is given, it is called to produce the table on a cache
+        miss - e.g. when filepath is a packed file and subkey names the table
+        inside it. Otherwise filepath is read as a CSV.
+        Tables that are not persisted are only kept in memory; this is for
+        modded tables, which would otherwise leave a pickle on disk for
+        every variant ever installed.
+        """
+        # Digesting reads the whole file, so it is kept out of the lock
+        digest = self.digest_store.get_digest(filepath)
+        key = f"{digest}-{subkey}-{encoding}"
+        with self.lock:
+            table = self.tables.get(key)
+            if table is not None:
+                self.tables.move_to_end(key)
+                return table
+        
+        pickle_path = os.path.join(self.cache_loc, key[:2], key + ".pickle")
+        table = None
+        if persist and os.path.isfile(pickle_path):
+            try:
+                with open(pickle_path, 'rb') as F:
+                    table = pickle.load(F)
+            except Exception:
+                table = None
+        if table is None:
+            table = loader() if loader is not None else read_mbetable_rows(filepath, encoding)
+            if persist:
+                os.makedirs(os.path.split(pickle_path)[0], exist_ok=True)
+                tmp_path = f"{pickle_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as F:
+                    pickle.dump(table, F, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, pickle_path)
+            
+        with self.lock:
+            self.tables[key] = table
+            self.tables.move_to_end(key)
+            while len(self.tables) > self.max_tables:
+                self.tables.popitem(last=False)
+        return table
+    
+    def get_dict(self, filepath, id_size, encoding=default_encoding, loader=None, subkey="", persist=True):
+        header, rows = self.get_rows(filepath, encoding, loader, subkey, persist)
+        # Slicing copies the records, so the result is safe to patch
+        return header, {tuple(row[:id_size]): row[id_size:] for row in rows}
+    
+    def take_new_digests(self):
+        """
+        Returns the digest entries made since the last call.
+        """
+        with self.lock:
+            digests = self.digest_store.digests
+            new_digests = {path: entry for path, entry in digests.items() if self.reported_digests.get(path) != entry}
+            self.reported_digests = dict(digests)
+        return new_digests
+    
+    def add_digests(self, digests):
+        if len(digests):
+            self.digest_store.digests.update(digests)
+            self.digest_store.dirty = True
+    
+    def save(self):
+        self.digest_store.save()
+
+
+table_caches = {}
+table_caches_lock = threading.Lock()
+
+def get_table_cache(cache_loc):
+    with table_caches_lock:
+        if cache_loc not in table_caches:
+            table_caches[cache_loc] = ParsedTableCache(cache_loc)
+        return table_caches[cache_loc]
+
+def save_table_caches():
+    """
+    Writes out the digests of any tables parsed since the last save. Called
+    once an install is done, rather than after every cache miss.
+    """
+    with table_caches_lock:
+        for table_cache in table_caches.values():
+            table_cache.save()
+
+def take_new_table_digests():
+    """
+    Worker processes have their own table caches, which are never saved.
+    Instead, the digests they make are sent back to the installer with each
+    job's results, and added to its caches with add_table_digests.
+    """
+    with table_caches_lock:
+        return {cache_loc: table_cache.take_new_digests() for cache_loc, table_cache in table_caches.items()}
+
+def add_table_digests(table_digests):
+    for cache_loc, digests in table_digests.items():
+        get_table_cache(cache_loc).add_digests(digests)
@@ -0,0 +1,215 @@
+import mmap
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+
+
+# Files are digested in fixed-size chunks, which are hashed in parallel and
+# combined into a Merkle root. Comparing roots is enough to tell whether two
+# files match, and comparing chunks shows where a damaged file went wrong.
+CHUNK_SIZE = 4*1024*1024
+DIGEST_SIZE = 16
+
+VANILLA    = "vanilla"
+MODDED     = "modded"
+UNRECORDED = "unrecorded"
+CORRUPT    = "corrupt"
+MISSING    = "missing"
+RECORDED   = "recorded"
+
+
+def digest_chunks(filepath, executor):
+    """
+    Returns the digests of every chunk of the file, joined together.
+    """
+    size = os.path.getsize(filepath)
+    if size == 0:
+        return b""
+    with open(filepath, 'rb') as F, mmap.mmap(F.fileno(), 0, access=mmap.ACCESS_READ) as M:
+        view = memoryview(M)
+        try:
+            # hashlib releases the GIL for large buffers, so chunks are
+            # hashed concurrently
+            def digest_chunk(offset):
+                chunk = view[offset:offset + CHUNK_SIZE]
+                try:
+                    return blake2b(chunk, digest_size=DIGEST_SIZE).digest()
+                finally:
+                    chunk.release()
+            return b''.join(executor.map(digest_chunk, range(0, size, CHUNK_SIZE)))
+        finally:
+            view.release()
+
+
+def get_merkle_root(chunks):
+    level = [chunks[i:i + DIGEST_SIZE] for i in range(0, len(chunks), DIGEST_SIZE)]
+    if not len(level):
+        return blake2b(b"", digest_size=DIGEST_SIZE).hexdigest()
+    while len(level) > 1:
+        level = [blake2b(b''.join(level[i:i + 2]), digest_size=DIGEST_SIZE).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+class FileSnapshot:
+    __slots__ = ("size", "mtime_ns", "chunks", "root")
+
+    def __init__(self, size, mtime_ns, chunks, root):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.chunks = chunks
+        self.root = root
+
+    @classmethod
+    def from_file(cls, filepath, executor):
+        stat = os.stat(filepath)
+        chunks = digest_chunks(filepath, executor)
+        return cls(stat.st_size, stat.st_mtime_ns, chunks, get_merkle_root(chunks))
+
+    def matches_stat(self, filepath):
+        stat = os.stat(filepath)
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+    
+    def has_same_stat(self, other):
+        return self.size == other.size and self.mtime_ns == other.mtime_ns
+
+    def count_differing_chunks(self, other):
+        n_chunks = max(len(self.chunks), len(other.chunks)) // DIGEST_SIZE
+        return sum(self.chunks[i*DIGEST_SIZE:(i+1)*DIGEST_SIZE] != other.chunks[i*DIGEST_SIZE:(i+1)*DIGEST_SIZE] for i in range(n_chunks))
+
+    def to_tuple(self):
+        return (self.size, self.mtime_ns, self.chunks, self.root)
+
+
+class VerificationStore:
+    """
+    Holds the snapshot of each backed-up file as it was when the backup
+    was made, which is taken to be vanilla, and the snapshot of each game
+    file as the mod manager last installed it. Both are keyed on the
+    normalised path relative to the game resources folder.
+    """
+    __slots__ = ("filepath", "vanilla", "installed")
+
+    version = 1
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.vanilla = {}
+        self.installed = {}
+        if os.path.isfile(filepath):
+            try:
+                with open(filepath, 'rb') as F:
+                    version, vanilla, installed = pickle.load(F)
+                if version == self.version:
+                    self.vanilla = {key: FileSnapshot(*value) for key, value in vanilla.items()}
+                    self.installed = {key: FileSnapshot(*value) for key, value in installed.items()}
+            except Exception:
+                # The snapshots will just be taken again
+                self.vanilla = {}
+                self.installed = {}
+
+    def save(self):
+        os.makedirs(os.path.split(self.filepath)[0], exist_ok=True)
+        tmp_filepath = f"{self.filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, 'wb') as F:
+            pickle.dump((self.version,
+                         {key: value.to_tuple() for key, value in self.vanilla.items()},
+                         {key: value.to_tuple() for key, value in self.installed.items()}),
+                        F, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filepath, self.filepath)
+
+
+class VerificationResult:
+    __slots__ = ("rel_path", "backup_status", "game_status", "backup_bad_chunks", "game_bad_chunks")
+
+    def __init__(self, rel_path, backup_status, game_status, backup_bad_chunks, game_bad_chunks):
+        self.rel_path = rel_path
+        self.backup_status = backup_status
+        self.game_status = game_status
+        self.backup_bad_chunks = backup_bad_chunks
+        self.game_bad_chunks = game_bad_chunks
+
+
+def get_snapshot_key(filepath, folder):
+    return os.path.normpath(os.path.relpath(filepath, folder))
+
+
+def record_snapshots(store_loc, folder, filepaths, installed, n_workers=None):
+    """
+    Takes snapshots of the files, as vanilla backups held in folder or as
+    files installed into the game folder, and saves them to the store.
+    """
+    store = VerificationStore(store_loc)
+    snapshots = store.installed if installed else store.vanilla
+    with ThreadPoolExecutor(n_workers) as executor:
+        for filepath in filepaths:
+            snapshots[get_snapshot_key(filepath, folder)] = FileSnapshot.from_file(filepath, executor)
+    store.save()
+
+
+def verify_backups(game_folder, backup_folder, store, full=False, n_workers=None):
+    """
+    Checks every backed-up file against its vanilla snapshot, and classes
+    the file in the game folder as vanilla, modded, unrecorded, corrupt, or
+    missing. Files whose size and mtime match their snapshot are only
+    re-read if full is set.
+    A game file is only corrupt if it still has the size and mtime of a
+    snapshot but not its contents; any other file that matches no snapshot
+    was written by something else, such as an install whose snapshot was
+    never taken.
+    """
+    results = []
+    with ThreadPoolExecutor(n_workers) as executor:
+        for root, _, files in os.walk(backup_folder):
+            for file in sorted(files):
+                backup_file = os.path.join(root, file)
+                rel_path = get_snapshot_key(backup_file, backup_folder)
+                game_file = os.path.join(game_folder, rel_path)
+                backup_bad_chunks = 0
+                game_bad_chunks = 0
+
+                # 1. Check the backup
+                vanilla = store.vanilla.get(rel_path)
+                if vanilla is None:
+                    # Backups made before snapshots were taken with them
+                    vanilla = FileSnapshot.from_file(backup_file, executor)
+                    store.vanilla[rel_path] = vanilla
+                    backup_status = RECORDED
+                elif not full and vanilla.matches_stat(backup_file):
+                    backup_status = VANILLA
+                else:
+                    snapshot = FileSnapshot.from_file(backup_file, executor)
+                    if snapshot.root == vanilla.root:
+                        # Only the mtime changed
+                        store.vanilla[rel_path] = snapshot
+                        backup_status = VANILLA
+                    else:
+                        backup_status = CORRUPT
+                        backup_bad_chunks = snapshot.count_differing_chunks(vanilla)
+
+                # 2. Check the game file
+                installed = store.installed.get(rel_path)
+                if not os.path.isfile(game_file):
+                    game_status = MISSING
+                elif os.path.samefile(backup_file, game_file):
+                    game_status = backup_status if backup_status != RECORDED else VANILLA
+                elif not full and vanilla.matches_stat(game_file):
+                    game_status = VANILLA
+                elif not full and installed is not None and installed.matches_stat(game_file):
+                    game_status = MODDED
+                else:
+                    snapshot = FileSnapshot.from_file(game_file, executor)
+                    if snapshot.root == vanilla.root:
+                        game_status = VANILLA
+                    elif installed is not None and snapshot.root == installed.root:
+                        game_status = MODDED
+                    elif installed is not None and snapshot.has_same_stat(installed):
+                        game_status = CORRUPT
+                        game_bad_chunks = snapshot.count_differing_chunks(installed)
+                    elif snapshot.has_same_stat(vanilla):
+                        game_status = CORRUPT
+                        game_bad_chunks = snapshot.count_differing_chunks(vanilla)
+                    else:
+                        game_status = UNRECORDED
+                results.append(VerificationResult(rel_path, backup_status, game_status, backup_bad_chunks, game_bad_chunks))
+    return results
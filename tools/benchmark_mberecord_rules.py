@@ -0,0 +1,239 @@
+"""
+Benchmarks the mberecord merge/append/remove rules on a synthetic table.
+
+Compares three implementations on the same patch layers:
+- reference: the per-record loops the rules in plugins/rules/mbe.py used
+  before they were moved into src/Utils/MBE.py
+- current:   merge_records, append_records and remove_records
+- columnar:  a prototype table of interned column lists with a row index
+             by key, which was considered as a replacement for the dict of
+             records
+
+Run from the repository root:
+    python tools/benchmark_mberecord_rules.py [--rows 10000] [--layers 100]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+from src.Utils.MBE import merge_records, append_records, remove_records
+
+
+FILL_VALUE = "0"
+
+
+############################
+# REFERENCE IMPLEMENTATION #
+############################
+def reference_merge(result, data, max_records):
+    for key, value in data.items():
+        if key in result:
+            result[key] = [(result[key][i] if subval == "" else subval) for i, subval in enumerate(value)][:max_records]
+        else:
+            result[key] = value[:max_records]
+
+def reference_append(result, data, max_records, fill_value):
+    for key, value in data.items():
+        nonzero_data = [elem for elem in result.get(key, []) if elem != fill_value]
+        new_data = [elem for elem in data[key] if elem not in nonzero_data]
+        nonzero_data.extend(new_data)
+        nonzero_data = nonzero_data[:max_records]
+
+        nonzero_data.extend([fill_value]*(max_records - len(nonzero_data)))
+        result[key] = nonzero_data[:max_records]
+
+def reference_remove(result, data, max_records, fill_value):
+    for key, value in data.items():
+        remove_elems = data[key]
+        nonzero_data = [elem for elem in result.get(key, []) if (elem != fill_value) or (elem not in remove_elems)]
+
+        nonzero_data.extend([fill_value]*(max_records - len(nonzero_data)))
+        result[key] = nonzero_data[:max_records]
+
+
+######################
+# COLUMNAR PROTOTYPE #
+######################
+class ColumnarTable:
+    """
+    Holds each field of the table as a list of interned strings, with the
+    row of each record indexed by its key.
+    """
+    __slots__ = ("n_fields", "columns", "row_index", "keys")
+
+    def __init__(self, n_fields):
+        self.n_fields = n_fields
+        self.columns = [[] for _ in range(n_fields)]
+        self.row_index = {}
+        self.keys = []
+
+    @classmethod
+    def from_records(cls, records, n_fields):
+        table = cls(n_fields)
+        table.set_records(records)
+        return table
+
+    def add_row(self, key):
+        row = len(self.keys)
+        self.row_index[key] = row
+        self.keys.append(key)
+        for column in self.columns:
+            column.append("")
+        return row
+
+    def get_record(self, row):
+        return [column[row] for column in self.columns]
+
+    def set_record(self, row, record):
+        for column, value in zip(self.columns, record):
+            column[row] = sys.intern(value)
+        # Records shorter than the table leave the rest of the row blank
+        for column in self.columns[len(record):]:
+            column[row] = ""
+
+    def set_records(self, records):
+        for key, record in records.items():
+            row = self.row_index.get(key)
+            if row is None:
+                row = self.add_row(key)
+            self.set_record(row, record[:self.n_fields])
+
+    def merge(self, records):
+        # Fields are patched one column at a time
+        rows = []
+        for key in records:
+            row = self.row_index.get(key)
+            rows.append(self.add_row(key) if row is None else row)
+        for i, column in enumerate(self.columns):
+            for row, record in zip(rows, records.values()):
+                if i < len(record):
+                    value = record[i]
+                    if value != "":
+                        column[row] = sys.intern(value)
+                elif column[row] != "":
+                    # Mirrors the reference, which truncates to the patch
+                    column[row] = ""
+
+    def append(self, records, fill_value):
+        # Whole records are needed, so each is gathered from the columns
+        updated = {}
+        for key, record in records.items():
+            row = self.row_index.get(key)
+            existing = () if row is None else self.get_record(row)
+            nonzero_data = [elem for elem in existing if elem != fill_value]
+            present = set(nonzero_data)
+            nonzero_data.extend([elem for elem in record if elem not in present])
+            del nonzero_data[self.n_fields:]
+            nonzero_data.extend([fill_value]*(self.n_fields - len(nonzero_data)))
+            updated[key] = nonzero_data
+        self.set_records(updated)
+
+    def remove(self, records, fill_value):
+        updated = {}
+        for key, record in records.items():
+            row = self.row_index.get(key)
+            existing = () if row is None else self.get_record(row)
+            if fill_value in record:
+                nonzero_data = [elem for elem in existing if elem != fill_value]
+            else:
+                nonzero_data = list(existing)
+            nonzero_data.extend([fill_value]*(self.n_fields - len(nonzero_data)))
+            updated[key] = nonzero_data
+        self.set_records(updated)
+
+
+###########
+# FIXTURE #
+###########
+def make_fixture(n_rows, n_fields, n_layers, layer_size, seed):
+    rng = random.Random(seed)
+    base = {(str(i),): [str(rng.randint(0, 50)) for _ in range(n_fields)] for i in range(n_rows)}
+    layers = []
+    for _ in range(n_layers):
+        layer = {}
+        # A few records in each layer are new to the table
+        for i in rng.sample(range(n_rows + n_rows//20), layer_size):
+            layer[(str(i),)] = [rng.choice(["", "", str(rng.randint(0, 50)), FILL_VALUE]) for _ in range(n_fields)]
+        layers.append((rng.choice("mar"), layer))
+    return base, layers
+
+
+def run_reference(base, layers, n_fields):
+    result = {key: list(record) for key, record in base.items()}
+    for op, layer in layers:
+        if op == "m":
+            reference_merge(result, layer, n_fields)
+        elif op == "a":
+            reference_append(result, layer, n_fields, FILL_VALUE)
+        else:
+            reference_remove(result, layer, n_fields, FILL_VALUE)
+    return result
+
+def run_current(base, layers, n_fields):
+    result = {key: list(record) for key, record in base.items()}
+    for op, layer in layers:
+        if op == "m":
+            merge_records(result, layer, n_fields)
+        elif op == "a":
+            append_records(result, layer, n_fields, FILL_VALUE)
+        else:
+            remove_records(result, layer, n_fields, FILL_VALUE)
+    return result
+
+def run_columnar(base, layers, n_fields):
+    table = ColumnarTable.from_records(base, n_fields)
+    for op, layer in layers:
+        if op == "m":
+            table.merge(layer)
+        elif op == "a":
+            table.append(layer, FILL_VALUE)
+        else:
+            table.remove(layer, FILL_VALUE)
+    return {key: table.get_record(row) for key, row in table.row_index.items()}
+
+
+def time_run(runner, base, layers, n_fields, repeats):
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = runner(base, layers, n_fields)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--fields", type=int, default=40)
+    parser.add_argument("--layers", type=int, default=100)
+    parser.add_argument("--layer-size", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    base, layers = make_fixture(args.rows, args.fields, args.layers, args.layer_size, args.seed)
+    runners = [("reference", run_reference), ("current", run_current), ("columnar", run_columnar)]
+    print(f"{args.rows} rows, {args.fields} fields, {args.layers} layers of {args.layer_size} records; best of {args.repeats}")
+
+    groups = [("all", layers)] + [(name, [layer for layer in layers if layer[0] == op]) for op, name in (("m", "merge"), ("a", "append"), ("r", "remove"))]
+    for group_name, group_layers in groups:
+        timings = []
+        reference = None
+        for runner_name, runner in runners:
+            elapsed, result = time_run(runner, base, group_layers, args.fields, args.repeats)
+            if reference is None:
+                reference = result
+            # The columnar table pads every record to the full width, so
+            # records are only compared up to the shorter of the two
+            matches = all(result[key][:len(record)] == record and len(result[key]) >= len(record) for key, record in reference.items()) and len(result) == len(reference)
+            timings.append(f"{runner_name} {elapsed:.2f}s{'' if matches else ' (MISMATCH)'}")
+        print(f"{group_name:>6} [{len(group_layers)} layers]: " + ", ".join(timings))
+
+
+if __name__ == "__main__":
+    main()